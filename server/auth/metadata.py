@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Optional
+
+import jwt
+import requests
+
+from config.logs_config import logger
+
+
+class OIDCMetadataProvider:
+    """Lazily loaded OpenID configuration and JWKS for token validation.
+
+    Nothing is fetched at import time. The first caller loads the metadata
+    from the disk cache (shared by all workers on the host) or, when that is
+    missing or stale, from `config_url`. Once the data is older than
+    `refresh_interval - refresh_ahead` a background refresh is started while
+    the last known-good keys keep being served.
+
+    `config_url` may be an http(s) URL, a `file://` URL or a plain path to a
+    local JSON file, which is handy for tests and offline development. The
+    same applies to the `jwks_uri` found inside the configuration.
+    """
+
+    def __init__(
+        self,
+        config_url: str,
+        cache_file: Optional[str] = None,
+        refresh_interval: int = 86400,
+        refresh_ahead: int = 3600,
+        min_refresh_interval: int = 60,
+        timeout: float = 5.0,
+    ):
+        self.config_url = config_url
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.refresh_interval = refresh_interval
+        self.refresh_ahead = refresh_ahead
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+
+        self._metadata: Optional[dict] = None
+        self._jwks: Optional[jwt.PyJWKSet] = None
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    # --- Public API ---
+    @property
+    def issuer(self) -> str:
+        return self._ensure_loaded()["issuer"]
+
+    def get_signing_key(self, token: str):
+        """Return the public key matching the `kid` in the token header."""
+        self._ensure_loaded()
+        kid = jwt.get_unverified_header(token).get("kid")
+
+        key = self._find_key(kid)
+        if key is None:
+            # Keys may have been rotated: refresh once (rate limited) and retry
+            self.refresh(force=False)
+            key = self._find_key(kid)
+        if key is None:
+            raise jwt.PyJWKClientError(f"Unable to find a signing key that matches: {kid}")
+        return key.key
+
+    def prewarm(self, background: bool = True) -> None:
+        """Load the metadata ahead of the first request."""
+        if background:
+            threading.Thread(
+                target=self._safe_ensure_loaded, name="oidc-prewarm", daemon=True
+            ).start()
+        else:
+            self._ensure_loaded()
+
+    def refresh(self, force: bool = True) -> bool:
+        """Fetch fresh metadata and keys. Returns True on success."""
+        with self._lock:
+            if not force and time.time() - self._last_attempt < self.min_refresh_interval:
+                return False
+            return self._fetch_and_store()
+
+    # --- Internals ---
+    def _safe_ensure_loaded(self):
+        try:
+            self._ensure_loaded()
+        except Exception as e:
+            logger.error(f"Failed to prewarm OIDC metadata: {e}")
+
+    def _find_key(self, kid):
+        if self._jwks is None:
+            return None
+        for key in self._jwks.keys:
+            if kid is None or key.key_id == kid:
+                return key
+        return None
+
+    def _ensure_loaded(self) -> dict:
+        if self._metadata is None:
+            with self._lock:
+                if self._metadata is None:
+                    if not self._load_from_disk(max_age=self.refresh_interval):
+                        if not self._fetch_once_per_host():
+                            # Stale copy is better than nothing when Azure is down
+                            if not self._load_from_disk(max_age=None):
+                                raise RuntimeError("OIDC metadata is not available")
+        elif self._is_due():
+            self._refresh_in_background()
+        return self._metadata
+
+    def _is_due(self) -> bool:
+        age = time.time() - self._fetched_at
+        return age >= self.refresh_interval - self.refresh_ahead
+
+    def _refresh_in_background(self):
+        # Never block a request thread behind a refresh already in progress
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._refreshing:
+                return
+            if time.time() - self._last_attempt < self.min_refresh_interval:
+                return
+            self._refreshing = True
+        finally:
+            self._lock.release()
+
+        def run():
+            try:
+                with self._lock:
+                    # Another worker may already have refreshed the disk copy
+                    if not self._load_from_disk(max_age=self.refresh_interval - self.refresh_ahead):
+                        self._fetch_and_store()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="oidc-refresh", daemon=True).start()
+
+    def _read_json(self, location: str) -> dict:
+        if location.startswith("file://"):
+            location = location[len("file://"):]
+        if not location.startswith(("http://", "https://")):
+            with open(location, "r", encoding="utf-8") as f:
+                return json.load(f)
+        response = requests.get(location, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_once_per_host(self) -> bool:
+        """Let one worker fetch while the others wait for its disk copy.
+
+        Without this every gunicorn worker booting at the same time would hit
+        the metadata endpoint. A lock file next to the cache file marks the
+        worker doing the fetch; the rest poll the cache file for up to
+        `timeout` seconds before falling back to their own fetch.
+        """
+        if self.cache_file is None:
+            return self._fetch_and_store()
+
+        lock_file = self.cache_file.with_suffix(".lock")
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                lock_age = time.time() - lock_file.stat().st_mtime
+            except FileNotFoundError:
+                lock_age = 0.0
+            if lock_age < self.timeout * 2:
+                deadline = time.time() + self.timeout
+                while time.time() < deadline:
+                    if self._load_from_disk(max_age=self.refresh_interval):
+                        return True
+                    time.sleep(0.1)
+            return self._fetch_and_store()
+        except OSError:
+            return self._fetch_and_store()
+
+        try:
+            os.close(fd)
+            return self._fetch_and_store()
+        finally:
+            try:
+                os.remove(lock_file)
+            except OSError:
+                pass
+
+    def _fetch_and_store(self) -> bool:
+        """Fetch metadata and JWKS. Must be called with `self._lock` held."""
+        self._last_attempt = time.time()
+        try:
+            metadata = self._read_json(self.config_url)
+            jwks = self._read_json(metadata["jwks_uri"])
+            key_set = jwt.PyJWKSet.from_dict(jwks)
+        except Exception as e:
+            logger.error(f"Failed to fetch OIDC metadata from {self.config_url}: {e}")
+            return False
+
+        self._metadata, self._jwks, self._fetched_at = metadata, key_set, time.time()
+        self._save_to_disk(metadata, jwks)
+        logger.info(f"OIDC metadata loaded from {self.config_url}")
+        return True
+
+    def _load_from_disk(self, max_age: Optional[int]) -> bool:
+        if self.cache_file is None or not self.cache_file.exists():
+            return False
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            fetched_at = float(cached["fetched_at"])
+            if max_age is not None and time.time() - fetched_at >= max_age:
+                return False
+            key_set = jwt.PyJWKSet.from_dict(cached["jwks"])
+        except Exception as e:
+            logger.error(f"Ignoring unreadable OIDC cache {self.cache_file}: {e}")
+            return False
+
+        self._metadata, self._jwks, self._fetched_at = cached["metadata"], key_set, fetched_at
+        return True
+
+    def _save_to_disk(self, metadata: dict, jwks: dict):
+        if self.cache_file is None:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"fetched_at": self._fetched_at, "metadata": metadata, "jwks": jwks}, f
+                )
+            # Atomic, so other workers never read a half-written file
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"Failed to persist OIDC cache {self.cache_file}: {e}")
@@ -0,0 +1,79 @@
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+from auth.validation import validate_bearer_token
+from auth.roles import _parse_roles_from_token
+from config.logs_config import logger
+
+# WSGI environ keys shared by SimpleMiddleware and the before_request hooks
+PRINCIPAL_KEY = "auth.principal"
+TIMINGS_KEY = "auth.timings"
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Authenticated caller, built once per request from the bearer token."""
+
+    user_id: Optional[str]
+    roles: Tuple[str, ...] = ()
+    expires_at: Optional[int] = None
+    claims: dict = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "Principal":
+        user_id = claims.get("oid") or claims.get("sub") or claims.get("user_id")
+        return cls(
+            user_id=user_id,
+            roles=tuple(_parse_roles_from_token(claims)),
+            expires_at=claims.get("exp"),
+            claims=claims,
+        )
+
+    def has_role(self, role: str) -> bool:
+        return role in self.roles
+
+
+def authenticate_request(environ) -> Optional[Principal]:
+    """Validate the bearer token of a request at most once.
+
+    The result is stored in the WSGI environ, so the middleware and the
+    Flask hooks share it. Returns None when there is no valid token.
+    Stage durations in milliseconds are stored under `TIMINGS_KEY`.
+    """
+    if PRINCIPAL_KEY in environ:
+        return environ[PRINCIPAL_KEY]
+
+    timings = {}
+    started = time.perf_counter()
+
+    principal = None
+    auth_header = environ.get("HTTP_AUTHORIZATION", "")
+    token = auth_header[len("Bearer "):] if auth_header.startswith("Bearer ") else None
+    timings["parse"] = (time.perf_counter() - started) * 1000
+
+    if token:
+        stage_started = time.perf_counter()
+        try:
+            claims = validate_bearer_token(token)
+        except Exception as e:
+            logger.debug(f"Could not validate bearer token: {e}")
+            claims = None
+        timings["validate"] = (time.perf_counter() - stage_started) * 1000
+
+        if claims:
+            stage_started = time.perf_counter()
+            principal = Principal.from_claims(claims)
+            # Kept for code that still reads the raw claims
+            environ["token_data"] = claims
+            timings["principal"] = (time.perf_counter() - stage_started) * 1000
+
+    timings["total"] = (time.perf_counter() - started) * 1000
+    environ[PRINCIPAL_KEY] = principal
+    environ[TIMINGS_KEY] = timings
+    return principal
+
+
+def format_server_timing(timings: dict) -> str:
+    """Render auth stage timings as a `Server-Timing` header value."""
+    return ", ".join(f"auth-{stage};dur={duration:.3f}" for stage, duration in timings.items())
@@ -0,0 +1,71 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from utils.pubsub import PubSub
+
+INVALIDATION_CHANNEL = "roles.invalidate"
+
+
+class RoleCache:
+    """Process-local cache of role names per user id.
+
+    Invalidations are published on `INVALIDATION_CHANNEL`, so every worker
+    sharing the same pub/sub backend drops its copy as well.
+    """
+
+    def __init__(self, pubsub: PubSub, ttl: int = 300, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: "OrderedDict[str, tuple[float, tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pubsub = pubsub
+        self._pubsub.subscribe(INVALIDATION_CHANNEL, self._on_invalidate)
+
+    def get(self, user_id: str) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.time():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return list(entry[1])
+
+    def set(self, user_id: str, roles: List[str], generation: Optional[int] = None) -> None:
+        """Store roles loaded from the DB.
+
+        Pass the `generation` read before loading: if an invalidation arrived
+        meanwhile, the (possibly stale) roles are not cached.
+        """
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[user_id] = (time.time() + self.ttl, tuple(roles))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Drop one user (or everyone when `user_id` is None) on all workers."""
+        self._pubsub.publish(INVALIDATION_CHANNEL, {"user_id": user_id})
+
+    def _on_invalidate(self, message: dict) -> None:
+        user_id = message.get("user_id")
+        with self._lock:
+            self.generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
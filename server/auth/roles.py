@@ -2,7 +2,15 @@ from functools import wraps
 from typing import Iterable, List, Optional, Union
 from flask import g, request, jsonify
 
-from db.models import User
+from db.models import Role, UserRole
+from config.config import auth_config
+from auth.role_cache import RoleCache
+from utils.pubsub import pubsub
+
+# Role names per user id, invalidated on role changes (see utils.roles and routes.users)
+ROLE_CACHE = RoleCache(
+    pubsub, ttl=auth_config.ROLE_CACHE_TTL, max_size=auth_config.ROLE_CACHE_MAX_SIZE
+)
 
 
 def _parse_roles_from_token(token_data) -> List[str]:
@@ -35,21 +43,44 @@ def _load_roles_from_db(db_session, user_id: str) -> List[str]:
     if not db_session or not user_id:
         return []
     try:
-        user = db_session.query(User).filter_by(id=user_id).first()
-        if not user:
-            return []
-        return user.get_roles()
+        rows = (
+            db_session.query(Role.name)
+            .join(UserRole, UserRole.role_id == Role.id)
+            .filter(UserRole.user_id == user_id)
+            .all()
+        )
+        return [name for (name,) in rows]
     except Exception:
         return []
 
 
+def get_user_roles(db_session, user_id: str) -> List[str]:
+    """Return role names for a user, served from `ROLE_CACHE` when possible."""
+    if not user_id:
+        return []
+    roles = ROLE_CACHE.get(user_id)
+    if roles is not None:
+        return roles
+    generation = ROLE_CACHE.generation
+    roles = _load_roles_from_db(db_session, user_id)
+    ROLE_CACHE.set(user_id, roles, generation)
+    return roles
+
+
+def invalidate_user_roles(user_id: Optional[str] = None) -> None:
+    """Drop cached roles of a user (or of everyone) on every worker."""
+    ROLE_CACHE.invalidate(user_id)
+
+
 def get_request_roles() -> List[str]:
     """Return roles for the current request.
 
     Priority:
     - If `g._roles_cache` set, return it.
     - If `g.user` exists and has `get_roles`, use DB to load roles (via relationship).
+    - If `g.principal` carries roles (already parsed from the token), use them.
     - If `request.environ['token_data']` exists, parse roles from token claims.
+    - If `g.user_id` is known, load roles from the DB through `ROLE_CACHE`.
     - Otherwise return [].
     """
     if hasattr(g, "_roles_cache") and isinstance(g._roles_cache, list):
@@ -73,11 +104,23 @@ def get_request_roles() -> List[str]:
             except Exception:
                 roles = []
 
+    # Principal built once per request by auth.principal.authenticate_request
+    if not roles:
+        from auth.principal import PRINCIPAL_KEY  # auth.principal imports this module
+
+        principal = getattr(g, "principal", None) or request.environ.get(PRINCIPAL_KEY)
+        if principal is not None:
+            roles = list(principal.roles)
+
     # If still empty, check token_data from environ (middleware may set it)
     if not roles:
         token_data = request.environ.get("token_data") or getattr(g, "token_data", None)
         roles = _parse_roles_from_token(token_data)
 
+    # Token carries no roles: fall back to DB assignments (usually a cache hit)
+    if not roles:
+        roles = get_user_roles(getattr(g, "db", None), getattr(g, "user_id", None))
+
     # Cache for request lifetime
     g._roles_cache = roles
     return roles
@@ -108,8 +151,9 @@ def hasRole(required: Union[str, Iterable[str]], require_all: bool = False):
             # If no DB/session or token at all, return 401
             # Check for authentication evidence
             auth_user = getattr(g, "user", None)
+            principal = getattr(g, "principal", None)
             token_data = request.environ.get("token_data") or getattr(g, "token_data", None)
-            if auth_user is None and token_data is None:
+            if auth_user is None and principal is None and token_data is None:
                 return jsonify({"error": "Unauthorized"}), 401
 
             roles = get_request_roles()
@@ -1,18 +1,31 @@
 import jwt
 import hmac
 import base64
-import requests
-from jwt import PyJWKClient
 
 from config.azure_config import azure_config
+from config.config import auth_config
 from config.logs_config import logger
+from auth.token_cache import TokenValidationCache
+from auth.metadata import OIDCMetadataProvider
 
 
 # Constants
 B2C_CONFIG_URL = f"https://{azure_config.AZURE_TENANT_NAME}.b2clogin.com/{azure_config.AZURE_TENANT_NAME}.onmicrosoft.com/{azure_config.AZURE_USER_FLOW}/v2.0/.well-known/openid-configuration"
-_metadata = requests.post(B2C_CONFIG_URL).json()
-_jwks_uri, ISSUER = _metadata["jwks_uri"], _metadata["issuer"]
-JWK_CLIENT = PyJWKClient(_jwks_uri)
+
+# Fetched lazily on first use (or on prewarm), never at import time
+OIDC_METADATA = OIDCMetadataProvider(
+    config_url=auth_config.OIDC_CONFIG_URL or B2C_CONFIG_URL,
+    cache_file=auth_config.OIDC_CACHE_FILE or None,
+    refresh_interval=auth_config.OIDC_REFRESH_INTERVAL,
+    refresh_ahead=auth_config.OIDC_REFRESH_AHEAD,
+    timeout=auth_config.OIDC_TIMEOUT,
+)
+
+# Validated tokens, so repeat requests skip the JWKS lookup and RS256 check
+TOKEN_CACHE = TokenValidationCache(
+    max_size=auth_config.TOKEN_CACHE_MAX_SIZE,
+    max_ttl=auth_config.TOKEN_CACHE_MAX_TTL,
+)
 
 
 def check_basic_auth(request) -> bool:
@@ -35,22 +48,27 @@ def check_basic_auth(request) -> bool:
 
 
 def validate_bearer_token(token: str):
+    cached = TOKEN_CACHE.get(token)
+    if cached is not None:
+        return cached
+
     try:
-        signing_key = JWK_CLIENT.get_signing_key_from_jwt(token).key
+        signing_key = OIDC_METADATA.get_signing_key(token)
+        issuer = OIDC_METADATA.issuer
     except Exception as e:
         logger.error(f"Error getting signing key: {e}")
         return None
     try:
         # Verify and decode token
-        logger.info(f"Validating token: {token}")
-        logger.info(f"audience:{azure_config.AZURE_CLIENT_ID}")
+        logger.debug("Validating token for audience %s", azure_config.AZURE_CLIENT_ID)
         decoded = jwt.decode(
             token,
             signing_key,
             algorithms=["RS256"],
             audience=azure_config.AZURE_CLIENT_ID,
-            issuer=ISSUER,
+            issuer=issuer,
         )
+        TOKEN_CACHE.set(token, decoded)
         return decoded
     except jwt.ExpiredSignatureError:
         logger.error("Token has expired")
@@ -0,0 +1,133 @@
+"""Freshness of GET /parkings/stream against polling GET /parkings.
+
+Opens --clients streams, changes lot statuses one at a time and measures
+how long after the commit every client has the new availableSpots.
+Then prints what the same freshness would cost by polling: the server
+time of one GET /parkings and the requests per second --clients would
+send polling at the interval the stream achieved.
+
+Usage (from the server folder):
+    python -m benchmarks.availability_stream --clients 50 --changes 200
+
+Uses a throwaway SQLite file unless DB_CONNECTION is set.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+if "DB_CONNECTION" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "stream_bench.sqlite3")
+    os.environ["DB_CONNECTION"] = f"sqlite:///{_db_file}"
+
+from sqlalchemy import insert
+
+from db.models import Base, engine, Parking, ParkingLot
+
+
+def seed(parkings: int, lots: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Parking),
+            [
+                {
+                    "id": p + 1, "name": f"P{p}", "location": "L",
+                    "latitude": 50 + p / 1000, "longitude": 30 + p / 1000,
+                    "capacity": lots, "available_spots": lots, "total_spots": lots,
+                }
+                for p in range(parkings)
+            ],
+        )
+        conn.execute(
+            insert(ParkingLot),
+            [
+                {"parking_id": p + 1, "lot_index": i, "status": "free"}
+                for p in range(parkings)
+                for i in range(lots)
+            ],
+        )
+
+
+def percentiles(timings: list) -> str:
+    timings = sorted(timings)
+    pick = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))]
+    return f"p50 {pick(0.50):.1f}ms  p95 {pick(0.95):.1f}ms  p99 {pick(0.99):.1f}ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--changes", type=int, default=200)
+    parser.add_argument("--parkings", type=int, default=100)
+    parser.add_argument("--lots", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    seed(args.parkings, args.lots)
+    from main import create_app
+
+    client = create_app().test_client()
+
+    # parking id -> (expected availableSpots, commit time, clients still waiting)
+    expected, latencies, lock = {}, [], threading.Lock()
+    ready = threading.Barrier(args.clients + 1)
+
+    def listen():
+        response = client.get("/parkings/stream", buffered=False)
+        chunks = iter(response.response)
+        next(chunks)  # retry
+        next(chunks)  # snapshot
+        ready.wait()
+        for chunk in chunks:
+            if not chunk.startswith(b"event: availability"):
+                continue
+            received = time.perf_counter()
+            payload = client.application.json.loads(chunk.split(b"data: ", 1)[1])
+            with lock:
+                for delta in payload:
+                    spots, committed, waiting = expected.get(delta["id"], (None, 0, 0))
+                    if delta["availableSpots"] == spots and waiting:
+                        latencies.append((received - committed) * 1000)
+                        expected[delta["id"]] = (spots, committed, waiting - 1)
+
+    for _ in range(args.clients):
+        threading.Thread(target=listen, daemon=True).start()
+    ready.wait()
+
+    rnd = random.Random(5)
+    taken = set()
+    spots = {p + 1: args.lots for p in range(args.parkings)}
+    for _ in range(args.changes):
+        parking_id, lot_index = rnd.randrange(args.parkings) + 1, rnd.randrange(args.lots)
+        status = "free" if (parking_id, lot_index) in taken else "taken"
+        taken.symmetric_difference_update({(parking_id, lot_index)})
+        spots[parking_id] += 1 if status == "free" else -1
+        client.patch(f"/parkings/{parking_id}/lot/{lot_index}", json={"status": status})
+        with lock:
+            expected[parking_id] = (spots[parking_id], time.perf_counter(), args.clients)
+        time.sleep(0.1)  # let every client get this change before the next one
+    time.sleep(0.5)
+
+    started = time.perf_counter()
+    polls = 20
+    for _ in range(polls):
+        client.get(f"/parkings/?per_page={args.parkings}")
+    poll_ms = (time.perf_counter() - started) * 1000 / polls
+
+    print(f"streams             : {args.clients}, {args.changes} changes, {len(latencies)} deliveries")
+    print(f"commit -> client    : {percentiles(latencies)}")
+    p50 = sorted(latencies)[len(latencies) // 2] / 1000 if latencies else 1
+    print(f"GET /parkings       : {poll_ms:.2f}ms per poll")
+    print(
+        f"polling as fresh   : {args.clients / p50:,.0f} requests/s, "
+        f"{args.clients / p50 * poll_ms / 1000:.1f} CPU-seconds per second"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
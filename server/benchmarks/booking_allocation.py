@@ -0,0 +1,119 @@
+"""Concurrency stress benchmark for booking spot allocation.
+
+Fires many simultaneous bookings at a single parking and checks that no
+spot is oversold: every successful booking holds a distinct lot, and the
+parking counters still match the lot rows afterwards.
+
+Usage (from the server folder):
+    python -m benchmarks.booking_allocation --spots 500 --bookings 2000 --workers 32
+
+Uses a throwaway SQLite file unless DB_CONNECTION is set (point it at a
+scratch PostgreSQL database to measure row-lock behaviour).
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+if "DB_CONNECTION" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "booking_bench.sqlite3")
+    os.environ["DB_CONNECTION"] = f"sqlite:///{_db_file}"
+
+from sqlalchemy.exc import OperationalError
+
+from db.models import Base, engine, SessionLocal, User, Car, Booking
+from utils.parking_lots import new_parking, insert_lots, reserve_lot, reconcile_parking_counters
+
+
+def seed(spots: int) -> tuple:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal.session_factory()
+    try:
+        db.add(User(id="bench-user", name="Bench", email="bench@example.com"))
+        db.add(Car(owner_id="bench-user", brand="B", model="M", license_plate="BENCH-1"))
+        parking = new_parking(
+            {"location": "Bench", "latitude": 0, "longitude": 0, "capacity": spots}
+        )
+        db.add(parking)
+        db.flush()
+        insert_lots(db, [parking])
+        db.commit()
+        car_id = db.query(Car.id).filter_by(license_plate="BENCH-1").scalar()
+        return parking.id, car_id
+    finally:
+        db.close()
+
+
+def book(parking_id: int, car_id: int, retries: int = 50):
+    """Same steps as routes.bookings.create_booking, in its own session."""
+    start = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+    for attempt in range(retries):
+        db = SessionLocal.session_factory()
+        try:
+            lot_id = reserve_lot(db, parking_id)
+            if lot_id is None:
+                db.rollback()
+                return None
+            db.add(
+                Booking(
+                    user_id="bench-user",
+                    car_id=car_id,
+                    parking_id=parking_id,
+                    lot_id=lot_id,
+                    status="active",
+                    start=start,
+                    end=start + timedelta(hours=2),
+                )
+            )
+            db.commit()
+            return lot_id
+        except OperationalError:
+            # SQLite "database is locked": back off and retry like a client would
+            db.rollback()
+            time.sleep(0.001 * (attempt + 1))
+        finally:
+            db.close()
+    raise RuntimeError("Booking kept failing on lock contention")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spots", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    parking_id, car_id = seed(args.spots)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda _: book(parking_id, car_id), range(args.bookings)))
+    elapsed = time.perf_counter() - started
+
+    granted = [lot_id for lot_id in results if lot_id is not None]
+    db = SessionLocal.session_factory()
+    try:
+        booked_lots = [lot_id for (lot_id,) in db.query(Booking.lot_id).all()]
+        drifts = reconcile_parking_counters(db, repair=False)
+    finally:
+        db.close()
+
+    expected = min(args.spots, args.bookings)
+    oversold = len(booked_lots) - len(set(booked_lots))
+    print(f"bookings fired   : {args.bookings} ({args.workers} workers)")
+    print(f"granted / denied : {len(granted)} / {len(results) - len(granted)}")
+    print(f"elapsed          : {elapsed:.3f}s ({args.bookings / elapsed:.0f} bookings/s)")
+    print(f"oversold lots    : {oversold}")
+    print(f"counter drift    : {drifts or 'none'}")
+
+    ok = len(granted) == expected and oversold == 0 and not drifts
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
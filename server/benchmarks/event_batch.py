@@ -0,0 +1,95 @@
+"""Sensor events sent one request each vs. through POST /parkings/<id>/events.
+
+Replays the same stream of lot status changes twice: as single
+PATCH /parkings/<id>/lot/<index> requests, then in batches, and prints
+events per second for both. A third run resends every batch to show
+the cost of an idempotent retry.
+
+Usage (from the server folder):
+    python -m benchmarks.event_batch --events 5000 --batch 500
+
+Uses a throwaway SQLite file unless DB_CONNECTION is set.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+if "DB_CONNECTION" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "event_bench.sqlite3")
+    os.environ["DB_CONNECTION"] = f"sqlite:///{_db_file}"
+
+from sqlalchemy import insert
+
+from db.models import Base, engine, Parking, ParkingLot
+
+
+def seed(lots: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Parking),
+            [
+                {
+                    "id": 1, "name": "P", "location": "L", "latitude": 0, "longitude": 0,
+                    "capacity": lots, "available_spots": lots, "total_spots": lots,
+                }
+            ],
+        )
+        conn.execute(
+            insert(ParkingLot),
+            [{"parking_id": 1, "lot_index": i, "status": "free"} for i in range(lots)],
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--lots", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(3)
+    stream = [(rnd.randrange(args.lots), rnd.choice(("taken", "free"))) for _ in range(args.events)]
+
+    seed(args.lots)
+    from main import create_app
+
+    client = create_app().test_client()
+
+    started = time.perf_counter()
+    for lot_index, status in stream:
+        client.patch(f"/parkings/1/lot/{lot_index}", json={"status": status})
+    single = time.perf_counter() - started
+
+    seed(args.lots)
+    batches = [
+        [
+            {"id": f"ev-{i + j}", "type": "lot_status", "lot_index": lot_index, "status": status}
+            for j, (lot_index, status) in enumerate(stream[i:i + args.batch])
+        ]
+        for i in range(0, len(stream), args.batch)
+    ]
+
+    def send_all():
+        started = time.perf_counter()
+        for batch in batches:
+            response = client.post("/parkings/1/events", json=batch)
+            assert response.status_code == 200, response.get_json()
+        return time.perf_counter() - started
+
+    batched = send_all()
+    retried = send_all()
+
+    print(f"events              : {args.events} ({len(batches)} batches of {args.batch})")
+    print(f"single requests     : {single:.2f}s  {args.events / single:,.0f} events/s")
+    print(f"batched             : {batched:.2f}s  {args.events / batched:,.0f} events/s")
+    print(f"batched, resent     : {retried:.2f}s  {args.events / retried:,.0f} events/s (all duplicates)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Latency benchmark for the entry gate (POST /parkings/<id>/entering).
+
+Seeds bookings around the current time, then sends gate requests for a
+mix of plates with a valid booking, plates booked for another time and
+unknown plates. Prints p50/p95/p99 of the endpoint served by the
+in-memory gate index, next to the database join it replaced, and fails
+when the endpoint's p99 is above --p99-target milliseconds.
+
+Usage (from the server folder):
+    python -m benchmarks.gate_latency --bookings 200000 --requests 5000 --p99-target 5
+
+Uses a throwaway SQLite file unless DB_CONNECTION is set.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+if "DB_CONNECTION" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "gate_bench.sqlite3")
+    os.environ["DB_CONNECTION"] = f"sqlite:///{_db_file}"
+
+from sqlalchemy import insert
+
+from db.models import Base, engine, SessionLocal, User, Car, Parking, Booking
+
+CHUNK = 20000
+
+
+def seed(bookings: int, parkings: int, cars: int) -> list:
+    """Returns (parking_id, plate) samples for the requests."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rnd = random.Random(7)
+    now = datetime.now().replace(second=0, microsecond=0)
+    samples = []
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": "gate-user", "name": "Gate", "email": "gate@example.com"}])
+        conn.execute(
+            insert(Parking),
+            [
+                {
+                    "id": p + 1, "name": f"P{p}", "location": "L", "latitude": 0, "longitude": 0,
+                    "capacity": 100, "available_spots": 100, "total_spots": 100,
+                }
+                for p in range(parkings)
+            ],
+        )
+        for i in range(0, cars, CHUNK):
+            conn.execute(
+                insert(Car),
+                [
+                    {"id": c + 1, "owner_id": "gate-user", "brand": "B", "model": "M", "license_plate": f"AA {c:06d}"}
+                    for c in range(i, min(i + CHUNK, cars))
+                ],
+            )
+        rows = []
+        for _ in range(bookings):
+            car = rnd.randrange(cars)
+            parking_id = rnd.randrange(parkings) + 1
+            # Spread over +-3 days, so most bookings are outside the gate window
+            start = now + timedelta(minutes=rnd.randrange(-3 * 24 * 60, 3 * 24 * 60))
+            end = start + timedelta(hours=2)
+            rows.append(
+                {
+                    "user_id": "gate-user", "car_id": car + 1, "parking_id": parking_id,
+                    "status": rnd.choice(("active", "active", "active", "cancelled")),
+                    "start": start, "end": end, "created_at": now,
+                }
+            )
+            if len(samples) < 10000:
+                samples.append((parking_id, f"aa{car:06d}"))
+            if len(rows) == CHUNK:
+                conn.execute(insert(Booking), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(Booking), rows)
+    # Plus plates the gate has never seen
+    samples += [(rnd.randrange(parkings) + 1, f"ZZ{i:06d}") for i in range(len(samples) // 4)]
+    return samples
+
+
+def percentiles(timings: list) -> str:
+    timings = sorted(timings)
+    pick = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))]
+    return f"p50 {pick(0.50):.3f}ms  p95 {pick(0.95):.3f}ms  p99 {pick(0.99):.3f}ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=200_000)
+    parser.add_argument("--parkings", type=int, default=200)
+    parser.add_argument("--cars", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--p99-target", type=float, default=5.0, help="milliseconds")
+    args = parser.parse_args(argv)
+
+    samples = seed(args.bookings, args.parkings, args.cars)
+    rnd = random.Random(11)
+    plan = [rnd.choice(samples) for _ in range(args.requests)]
+
+    from main import create_app
+
+    client = create_app().test_client()
+    client.post("/parkings/1/entering", json={"license_plate": "warm-up"})  # first load of the index
+
+    endpoint, opened = [], 0
+    for parking_id, plate in plan:
+        started = time.perf_counter()
+        response = client.post(f"/parkings/{parking_id}/entering", json={"license_plate": plate})
+        endpoint.append((time.perf_counter() - started) * 1000)
+        opened += response.status_code == 200
+
+    from utils.gate_index import gate_index
+
+    # The lookup alone, and the previous implementation: a Booking/Car join per vehicle
+    db = SessionLocal.session_factory()
+    index, database = [], []
+    try:
+        for parking_id, plate in plan:
+            started = time.perf_counter()
+            gate_index.lookup(db, parking_id, plate)
+            index.append((time.perf_counter() - started) * 1000)
+        for parking_id, plate in plan[: min(len(plan), 1000)]:
+            started = time.perf_counter()
+            db.query(Booking).join(Booking.car).filter(
+                Booking.parking_id == parking_id, Car.license_plate == plate
+            ).first()
+            database.append((time.perf_counter() - started) * 1000)
+    finally:
+        db.close()
+
+    p99 = sorted(endpoint)[min(len(endpoint) - 1, int(0.99 * len(endpoint)))]
+    print(f"requests          : {len(plan)} ({opened} opened the gate)")
+    print(f"endpoint          : {percentiles(endpoint)}")
+    print(f"index lookup      : {percentiles(index)}")
+    print(f"db join (before)  : {percentiles(database)}")
+    ok = p99 <= args.p99_target
+    print(f"p99 target {args.p99_target}ms: {'OK' if ok else 'FAILED'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Latency of GET /parkings/near and /parkings/within over many parkings.
+
+Seeds --parkings parkings scattered over a country-sized area and
+clustered around a few cities, then times near searches around random
+city points, map-view bounding boxes and 10 km `sort=free` searches.
+The grid lookup alone and a plain SQL BETWEEN filter on latitude/longitude
+(what the endpoint would run without the index) are timed for comparison.
+
+Usage (from the server folder):
+    python -m benchmarks.geo_search --parkings 10000 --requests 1000
+
+Uses a throwaway SQLite file unless DB_CONNECTION is set.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+if "DB_CONNECTION" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "geo_bench.sqlite3")
+    os.environ["DB_CONNECTION"] = f"sqlite:///{_db_file}"
+
+from sqlalchemy import insert
+
+from db.models import Base, engine, SessionLocal, Parking
+
+CITIES = [(50.45, 30.52), (49.84, 24.03), (46.48, 30.72), (49.99, 36.23), (48.46, 35.05)]
+
+
+def seed(parkings: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rnd = random.Random(9)
+    rows = []
+    for p in range(parkings):
+        if rnd.random() < 0.8:
+            lat, lng = rnd.choice(CITIES)
+            lat, lng = rnd.gauss(lat, 0.05), rnd.gauss(lng, 0.08)
+        else:
+            lat, lng = rnd.uniform(44.5, 52.3), rnd.uniform(22.2, 40.2)
+        capacity = rnd.randrange(10, 300)
+        rows.append(
+            {
+                "id": p + 1, "name": f"P{p}", "location": "L", "latitude": round(lat, 6),
+                "longitude": round(lng, 6), "capacity": capacity,
+                "available_spots": rnd.randrange(capacity), "total_spots": capacity,
+            }
+        )
+    with engine.begin() as conn:
+        conn.execute(insert(Parking), rows)
+
+
+def percentiles(timings: list) -> str:
+    timings = sorted(timings)
+    pick = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))]
+    return f"p50 {pick(0.50):.3f}ms  p95 {pick(0.95):.3f}ms  p99 {pick(0.99):.3f}ms"
+
+
+def timed(calls) -> list:
+    timings = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parkings", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    seed(args.parkings)
+    from main import create_app
+    from utils.geo import bbox_around
+    from utils.spatial_index import spatial_index
+
+    client = create_app().test_client()
+    rnd = random.Random(13)
+    points = []
+    for _ in range(args.requests):
+        lat, lng = rnd.choice(CITIES)
+        points.append((rnd.gauss(lat, 0.03), rnd.gauss(lng, 0.05)))
+    # Map views of a city district, about 3 x 2 km
+    boxes = [f"{lng - 0.02},{lat - 0.01},{lng + 0.02},{lat + 0.01}" for lat, lng in points]
+
+    client.get(f"/parkings/near?lat={points[0][0]}&lng={points[0][1]}")  # first load of the grid
+
+    near = timed(lambda p=p: client.get(f"/parkings/near?lat={p[0]}&lng={p[1]}&radius=1000") for p in points)
+    within = timed(lambda b=b: client.get(f"/parkings/within?bbox={b}&limit=200") for b in boxes)
+    # The most free spots within 10 km, ranked by the database
+    free = timed(
+        lambda p=p: client.get(f"/parkings/near?lat={p[0]}&lng={p[1]}&radius=10000&sort=free") for p in points
+    )
+
+    db = SessionLocal.session_factory()
+    try:
+        grid = timed(lambda p=p: spatial_index.near(db, p[0], p[1], 1000) for p in points)
+
+        def sql_box(lat, lng):
+            box = bbox_around(lat, lng, 1000)
+            db.query(Parking.id, Parking.latitude, Parking.longitude).filter(
+                Parking.latitude.between(box.min_lat, box.max_lat),
+                Parking.longitude.between(box.min_lng, box.max_lng),
+            ).all()
+
+        sql = timed(lambda p=p: sql_box(*p) for p in points)
+    finally:
+        db.close()
+
+    print(f"parkings            : {args.parkings}, {args.requests} requests each")
+    print(f"GET /parkings/near  : {percentiles(near)}")
+    print(f"GET /parkings/within: {percentiles(within)}")
+    print(f"near, sort=free     : {percentiles(free)}")
+    print(f"grid lookup (1 km)  : {percentiles(grid)}")
+    print(f"SQL BETWEEN (1 km)  : {percentiles(sql)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
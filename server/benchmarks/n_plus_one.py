@@ -0,0 +1,114 @@
+"""N+1 query detector for the list endpoints.
+
+Requests every list endpoint with a small and a large page size and
+counts the SQL statements each request runs. With the loader profiles of
+db/loaders.py and the projections of db/projections.py the count must not
+depend on the page size; any endpoint whose count grows is reported with
+its statements and the script exits non-zero, so it can run as a CI check.
+
+Usage (from the server folder):
+    python -m benchmarks.n_plus_one --small 2 --large 20
+
+Uses a throwaway SQLite file unless DB_CONNECTION is set.
+"""
+import os
+import sys
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+if "DB_CONNECTION" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "n_plus_one.sqlite3")
+    os.environ["DB_CONNECTION"] = f"sqlite:///{_db_file}"
+
+from db.models import Base, engine, SessionLocal, User, Role, UserRole, Car, Booking
+from utils.parking_lots import new_parking, insert_lots
+from utils.query_counter import QueryCounter
+
+USER_ID = "user-0"
+
+ENDPOINTS = [
+    "/users/",
+    f"/users/{USER_ID}/cars",
+    f"/users/{USER_ID}/bookings",
+    f"/bookings/{USER_ID}",
+    "/bookings/",
+    "/parkings/",
+]
+
+
+def seed(rows: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal.session_factory()
+    try:
+        roles = [Role(name="user"), Role(name="admin")]
+        db.add_all(roles)
+        parkings = [
+            new_parking({"name": f"P{i}", "location": "L", "latitude": 0, "longitude": 0, "capacity": 3})
+            for i in range(rows)
+        ]
+        db.add_all(parkings)
+        for i in range(rows):
+            user = User(id=f"user-{i}", name=f"User {i}", email=f"u{i}@example.com")
+            user.user_roles = [UserRole(role=role) for role in roles]
+            db.add(user)
+        db.flush()
+        insert_lots(db, parkings)
+
+        start = datetime(2026, 1, 1)
+        for i in range(rows):
+            car = Car(owner_id=USER_ID, brand="B", model="M", license_plate=f"AA{i:04d}")
+            db.add(car)
+            db.flush()
+            db.add(
+                Booking(
+                    user_id=USER_ID,
+                    car_id=car.id,
+                    parking_id=parkings[i].id,
+                    status="active",
+                    start=start + timedelta(hours=i),
+                    end=start + timedelta(hours=i + 2),
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def count_queries(client, url: str, per_page: int) -> QueryCounter:
+    with QueryCounter(engine) as counter:
+        response = client.get(url, query_string={"per_page": per_page, "with_total": "false"})
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {url} returned {response.status_code}: {response.get_data(as_text=True)}")
+    return counter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--small", type=int, default=2)
+    parser.add_argument("--large", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    seed(args.large)
+    from main import create_app
+
+    client = create_app().test_client()
+    failed = []
+    for url in ENDPOINTS:
+        count_queries(client, url, args.small)  # warm caches that would skew the first run
+        small = count_queries(client, url, args.small)
+        large = count_queries(client, url, args.large)
+        grows = large.count > small.count
+        print(f"{'N+1 ' if grows else 'ok  '} {url}: {small.count} queries @ {args.small}, {large.count} @ {args.large}")
+        if grows:
+            failed.append(url)
+            for statement in large.statements:
+                print(f"       {' '.join(statement.split())[:160]}")
+
+    print("FAILED" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
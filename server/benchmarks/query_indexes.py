@@ -0,0 +1,226 @@
+"""Query plan and latency benchmark for the secondary indexes.
+
+Seeds a large dataset (one million bookings by default), then runs the
+hot queries of the list/filter endpoints twice: without the secondary
+indexes declared in db/models.py and with them. Prints each query's plan
+and median latency for both runs.
+
+Usage (from the server folder):
+    python -m benchmarks.query_indexes --bookings 1000000 --repeat 20
+
+Uses a throwaway SQLite file unless DB_CONNECTION is set (point it at a
+scratch PostgreSQL database to see its plans; the tables are recreated).
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+if "DB_CONNECTION" not in os.environ:
+    _db_file = os.path.join(tempfile.mkdtemp(), "index_bench.sqlite3")
+    os.environ["DB_CONNECTION"] = f"sqlite:///{_db_file}"
+
+from sqlalchemy import select, insert, text
+
+from db.models import (
+    Base,
+    engine,
+    User,
+    Role,
+    UserRole,
+    Car,
+    Parking,
+    ParkingLot,
+    Booking,
+    Device,
+)
+
+CHUNK = 20000
+STATUSES = ("active", "completed", "cancelled")
+
+
+def _insert(conn, model, rows):
+    for i in range(0, len(rows), CHUNK):
+        conn.execute(insert(model), rows[i:i + CHUNK])
+
+
+def seed(bookings: int, users: int, parkings: int, lots: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rnd = random.Random(42)
+    now = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        _insert(conn, Role, [{"id": 1, "name": "user"}, {"id": 2, "name": "admin"}])
+        _insert(
+            conn,
+            User,
+            [{"id": f"user-{i}", "name": f"User {i}", "email": f"u{i}@example.com"} for i in range(users)],
+        )
+        _insert(
+            conn,
+            UserRole,
+            [{"user_id": f"user-{i}", "role_id": 2 if i % 100 == 0 else 1} for i in range(users)],
+        )
+        _insert(
+            conn,
+            Car,
+            [
+                {"id": i + 1, "owner_id": f"user-{i}", "brand": "B", "model": "M", "license_plate": f"AA{i:06d}"}
+                for i in range(users)
+            ],
+        )
+        _insert(
+            conn,
+            Parking,
+            [
+                {
+                    "id": p + 1, "name": f"Parking {p}", "location": "L", "latitude": 0, "longitude": 0,
+                    "capacity": lots, "available_spots": lots, "total_spots": lots,
+                }
+                for p in range(parkings)
+            ],
+        )
+        _insert(
+            conn,
+            ParkingLot,
+            [
+                {"parking_id": p + 1, "lot_index": i, "status": "taken" if rnd.random() < 0.9 else "free"}
+                for p in range(parkings)
+                for i in range(lots)
+            ],
+        )
+        _insert(
+            conn,
+            Device,
+            [
+                {"serial_number": f"SN{i}", "status": "revoked" if i % 50 == 0 else "active"}
+                for i in range(parkings * 5)
+            ],
+        )
+        rows = []
+        for _ in range(bookings):
+            user = rnd.randrange(users)
+            start = now + timedelta(minutes=rnd.randrange(365 * 24 * 60))
+            rows.append(
+                {
+                    "user_id": f"user-{user}",
+                    "car_id": user + 1,
+                    "parking_id": rnd.randrange(parkings) + 1,
+                    "status": rnd.choice(STATUSES),
+                    "start": start,
+                    "end": start + timedelta(hours=2),
+                    "created_at": start - timedelta(days=rnd.randrange(30)),
+                }
+            )
+            if len(rows) == CHUNK:
+                conn.execute(insert(Booking), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(Booking), rows)
+
+
+def hot_queries() -> dict:
+    """The filter/sort shapes of routes/ and utils/, with fixed arguments."""
+    window = datetime(2026, 6, 1)
+    return {
+        "user bookings, newest first": select(Booking)
+        .where(Booking.user_id == "user-7")
+        .order_by(Booking.created_at.desc())
+        .limit(10),
+        "all bookings, default sort": select(Booking).order_by(Booking.created_at).limit(10),
+        "bookings ?status=": select(Booking)
+        .where(Booking.status == "active")
+        .order_by(Booking.created_at)
+        .limit(10),
+        "parking bookings in a window": select(Booking)
+        .where(Booking.parking_id == 3, Booking.start >= window, Booking.start <= window + timedelta(days=7))
+        .limit(10),
+        "availability index load": select(Booking.id, Booking.start, Booking.end)
+        .where(Booking.parking_id == 3, Booking.status.notin_(("cancelled",)))
+        .order_by(Booking.start),
+        "car entering": select(Booking)
+        .join(Car, Booking.car_id == Car.id)
+        .where(Booking.parking_id == 3, Car.license_plate == "AA000007"),
+        "first free lot": select(ParkingLot.id)
+        .where(ParkingLot.parking_id == 3, ParkingLot.status == "free")
+        .order_by(ParkingLot.lot_index)
+        .limit(1),
+        "users ?role=": select(User)
+        .join(UserRole, User.id == UserRole.user_id)
+        .join(Role, Role.id == UserRole.role_id)
+        .where(Role.name == "admin")
+        .order_by(User.id)
+        .limit(10),
+        "user roles": select(Role.name)
+        .join(UserRole, UserRole.role_id == Role.id)
+        .where(UserRole.user_id == "user-7"),
+        "user cars": select(Car).where(Car.owner_id == "user-7").order_by(Car.id).limit(10),
+        "revoked devices": select(Device).where(Device.status == "revoked"),
+    }
+
+
+def explain(conn, stmt) -> str:
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        return "; ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    return " | ".join(row[0].strip() for row in conn.execute(text(f"EXPLAIN {sql}")))
+
+
+def measure(repeat: int) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for name, stmt in hot_queries().items():
+            conn.execute(stmt).all()  # warm the page cache
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(stmt).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (statistics.median(timings), explain(conn, stmt))
+    return results
+
+
+def set_indexes(create: bool) -> None:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if create:
+                index.create(bind=engine, checkfirst=True)
+            else:
+                index.drop(bind=engine, checkfirst=True)
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--parkings", type=int, default=500)
+    parser.add_argument("--lots", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    seed(args.bookings, args.users, args.parkings, args.lots)
+    print(f"seeded {args.bookings} bookings in {time.perf_counter() - started:.1f}s ({engine.dialect.name})")
+
+    set_indexes(create=False)
+    before = measure(args.repeat)
+    set_indexes(create=True)
+    after = measure(args.repeat)
+
+    for name in before:
+        (ms_before, plan_before), (ms_after, plan_after) = before[name], after[name]
+        print(f"\n{name}: {ms_before:.2f} ms -> {ms_after:.2f} ms ({ms_before / max(ms_after, 1e-6):.0f}x)")
+        print(f"  before: {plan_before}")
+        print(f"  after : {plan_after}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,6 +27,106 @@ class CAConfig(Settings):
     CRL_FILE: str = "crl.pem"
 
 
+class AuthConfig(Settings):
+    TOKEN_CACHE_MAX_SIZE: int = 1024
+    TOKEN_CACHE_MAX_TTL: int = 300  # seconds, capped by the token's own `exp`
+    OIDC_CONFIG_URL: str = ""  # URL, file:// URL or local path; derived from Azure config if empty
+    OIDC_CACHE_FILE: str = "oidc_metadata.json"
+    OIDC_REFRESH_INTERVAL: int = 86400  # seconds
+    OIDC_REFRESH_AHEAD: int = 3600  # seconds before expiry to refresh in background
+    OIDC_TIMEOUT: float = 5.0
+    ROLE_CACHE_TTL: int = 300  # seconds
+    ROLE_CACHE_MAX_SIZE: int = 10000
+
+
+class LogConfig(Settings):
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" (one object per line) or "text"
+    LOG_FILE: str = "server.log"
+    # Several workers rotating one file lose records: with more than one
+    # worker use "external" (e.g. logrotate; the file is reopened when moved)
+    LOG_ROTATION: str = "size"  # "size", "time" or "external"
+    LOG_MAX_BYTES: int = 50 * 1024 * 1024
+    LOG_ROTATE_WHEN: str = "midnight"  # see logging.handlers.TimedRotatingFileHandler
+    LOG_BACKUP_COUNT: int = 14
+    LOG_COMPRESS: bool = True  # gzip rotated segments
+    LOG_QUEUE_SIZE: int = 10000  # records beyond this are dropped, never block requests
+    LOG_BATCH_SIZE: int = 256
+    LOG_FLUSH_INTERVAL: float = 1.0  # seconds
+    LOG_HEADERS_SAMPLE_RATE: float = 0.01  # share of requests logged with headers
+    LOG_BODY_SAMPLE_RATE: float = 0.01  # share of requests logged with body
+    LOG_BODY_MAX_BYTES: int = 2048
+
+
+class JournalConfig(Settings):
+    JOURNAL_DIR: str = "journal"
+    JOURNAL_FSYNC_INTERVAL: float = 1.0  # seconds
+    JOURNAL_SEGMENT_MAX_BYTES: int = 16 * 1024 * 1024
+
+
+class AvailabilityConfig(Settings):
+    AVAILABILITY_INDEX_TTL: int = 300  # seconds before a parking's booking index is reloaded
+
+
+class CountConfig(Settings):
+    COUNT_CACHE_TTL: int = 30  # seconds a list total is reused; writes invalidate earlier
+
+
+class HttpCacheConfig(Settings):
+    HTTP_CACHE_MAX_AGE: int = 5  # seconds shared caches may serve public GETs unrevalidated
+    CRL_CACHE_MAX_AGE: int = 300
+
+
+class CompressionConfig(Settings):
+    COMPRESS_MIN_SIZE: int = 1024  # bytes; smaller bodies aren't worth the CPU
+    COMPRESS_LEVEL: int = 6  # gzip, 1-9
+    COMPRESS_BR_QUALITY: int = 4  # brotli, 0-11
+
+
+class GateConfig(Settings):
+    GATE_INDEX_REFRESH: int = 300  # seconds between reloads of the upcoming bookings window
+    GATE_EARLY_ARRIVAL: int = 15  # minutes before a booking's start the gate opens
+
+
+class EventsConfig(Settings):
+    EVENT_BATCH_MAX: int = 1000  # events per ingestion request
+    EVENT_ID_RETENTION_DAYS: int = 7  # how long event ids are remembered for deduplication
+    EVENT_EXIT_OVERSTAY: int = 720  # minutes after its end an exit still completes a booking
+
+
+class StreamConfig(Settings):
+    STREAM_COALESCE_INTERVAL: float = 0.05  # seconds changes are collected before one read and push
+    STREAM_HEARTBEAT: int = 15  # seconds between keep-alive comments on idle streams
+    STREAM_QUEUE_SIZE: int = 100  # pushes buffered per client before it is resynced
+    STREAM_MAX_IDS: int = 500
+    STREAM_MAX_CLIENTS: int = 100  # open streams per worker; each holds a worker thread
+
+
+class GeoConfig(Settings):
+    GEO_CELL_DEGREES: float = 0.01  # grid cell size of the spatial index, ~1.1 km of latitude
+    GEO_INDEX_TTL: int = 300  # seconds before the grid is reloaded from the DB
+    GEO_MAX_RADIUS: int = 50000  # meters
+    GEO_MAX_RESULTS: int = 500
+
+
+class PubSubConfig(Settings):
+    PUBSUB_BACKEND: str = "local"  # "local" (single process) or "file" (workers on one host)
+    PUBSUB_DIR: str = "pubsub"
+    PUBSUB_POLL_INTERVAL: float = 0.5  # seconds
+
+
 db_config = DataBaseConfig()
 manager_config = ManagerConfig()
 ca_config = CAConfig()
+auth_config = AuthConfig()
+pubsub_config = PubSubConfig()
+log_config = LogConfig()
+journal_config = JournalConfig()
+availability_config = AvailabilityConfig()
+count_config = CountConfig()
+http_cache_config = HttpCacheConfig()
+compression_config = CompressionConfig()
+gate_config = GateConfig()
+events_config = EventsConfig()
+stream_config = StreamConfig()
+geo_config = GeoConfig()
@@ -1,17 +1,25 @@
 import os
+import sys
+import gzip
+import json
+import queue
+import shutil
+import atexit
 import datetime
+import threading
 import logging
 import logging.config
+import logging.handlers
 from pathlib import Path
 from flask import g, has_app_context
 
+from config.config import log_config, pubsub_config
+
 BASE_DIR = Path(__file__).resolve().parent
 LOG_PATH = BASE_DIR / "../logs"
 LOG_PATH.mkdir(parents=True, exist_ok=True)
 
-log_filename = (
-    LOG_PATH / f"{datetime.datetime.now().strftime('%Y_%m_%d_%H_%M')}_log_info.log"
-)
+log_filename = LOG_PATH / log_config.LOG_FILE
 
 
 # # === RequestID filter ===
@@ -27,46 +35,218 @@ class RequestIDFilter(logging.Filter):
         return True
 
 
+# === JSON lines formatter ===
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, ready for the log shipper.
+
+    Request fields passed through `extra=` (see `REQUEST_FIELDS`) become
+    top-level keys instead of being embedded in the message text.
+    """
+
+    REQUEST_FIELDS = ("method", "path", "status", "duration_ms", "remote_addr")
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for field in self.REQUEST_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# === Rotation with compression ===
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+# === Async logging ===
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Hands records over to `LogWriter` without formatting them.
+
+    The stock QueueHandler formats every record on the calling thread; here
+    formatting is left to the writer thread. When the queue is full the
+    record is dropped (and counted) instead of blocking the request.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchFlushMixin:
+    """File handler that leaves flushing to `LogWriter`, once per batch."""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchingRotatingFileHandler(BatchFlushMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class BatchingTimedRotatingFileHandler(
+    BatchFlushMixin, logging.handlers.TimedRotatingFileHandler
+):
+    pass
+
+
+class BatchingWatchedFileHandler(BatchFlushMixin, logging.handlers.WatchedFileHandler):
+    """Reopens the file after an external tool rotated it; never rotates itself."""
+
+
+class LogWriter(threading.Thread):
+    """Writer thread draining the log queue in batches.
+
+    Records are passed to the target handlers as they arrive, but the
+    handlers are flushed only once per batch (or every `flush_interval`
+    seconds), so disk writes are grouped instead of one per record.
+    """
+
+    _STOP = object()
+
+    def __init__(self, log_queue, handlers, batch_size=256, flush_interval=1.0):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def run(self):
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            for record in batch:
+                if record is self._STOP:
+                    running = False
+                    continue
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            self._flush()
+
+    def _flush(self):
+        for handler in self.handlers:
+            try:
+                if isinstance(handler, BatchFlushMixin):
+                    handler.flush_batch()
+                else:
+                    handler.flush()
+            except Exception:
+                pass
+
+    def stop(self):
+        self.queue.put(self._STOP)
+        self.join(timeout=5)
+        for handler in self.handlers:
+            handler.close()
+
+
 # === Logging configuration ===
+_text_formatter = logging.Formatter(
+    "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s",
+    datefmt="%d %b %y %H:%M:%S",
+)
+_formatter = JsonFormatter() if log_config.LOG_FORMAT == "json" else _text_formatter
+
+if log_config.LOG_ROTATION == "external":
+    _file_handler = BatchingWatchedFileHandler(str(log_filename), encoding="utf-8")
+elif log_config.LOG_ROTATION == "time":
+    _file_handler = BatchingTimedRotatingFileHandler(
+        str(log_filename),
+        when=log_config.LOG_ROTATE_WHEN,
+        backupCount=log_config.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+else:
+    _file_handler = BatchingRotatingFileHandler(
+        str(log_filename),
+        maxBytes=log_config.LOG_MAX_BYTES,
+        backupCount=log_config.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+if log_config.LOG_COMPRESS and log_config.LOG_ROTATION != "external":
+    _file_handler.namer = _gzip_namer
+    _file_handler.rotator = _gzip_rotator
+_file_handler.setFormatter(_formatter)
+_file_handler.setLevel(log_config.LOG_LEVEL)
+
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(_text_formatter)
+_console_handler.setLevel(log_config.LOG_LEVEL)
+
+log_queue = queue.Queue(maxsize=log_config.LOG_QUEUE_SIZE)
+log_writer = LogWriter(
+    log_queue,
+    [_file_handler, _console_handler],
+    batch_size=log_config.LOG_BATCH_SIZE,
+    flush_interval=log_config.LOG_FLUSH_INTERVAL,
+)
+
 logging_schema = {
     "version": 1,
     "disable_existing_loggers": False,
+    # Runs on the request thread, where `g` is available
     "filters": {"request_id_filter": {"()": RequestIDFilter}},
-    "formatters": {
-        "standard": {
-            "format": "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s",
-            "datefmt": "%d %b %y %H:%M:%S",
-        }
-    },
     "handlers": {
-        "file_request": {
-            "class": "logging.FileHandler",
-            "filename": str(log_filename),
-            "mode": "a",
-            "formatter": "standard",
-            "level": "INFO",
+        "async_queue": {
+            "()": AsyncQueueHandler,
+            "log_queue": log_queue,
+            "level": log_config.LOG_LEVEL,
             "filters": ["request_id_filter"],
-            "encoding": "utf-8",
-        },
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "standard",
-            "level": "INFO",
-            "stream": "ext://sys.stdout",
         },
     },
     "loggers": {
         "__main__": {
-            "handlers": ["file_request", "console"],
-            "level": "INFO",
+            "handlers": ["async_queue"],
+            "level": log_config.LOG_LEVEL,
             "propagate": False,
         }
     },
-    "root": {"handlers": ["file_request", "console"], "level": "INFO"},
+    "root": {"handlers": ["async_queue"], "level": log_config.LOG_LEVEL},
 }
 
 # Apply configuration
 logging.config.dictConfig(logging_schema)
+log_writer.start()
+atexit.register(log_writer.stop)
 
 logger = logging.getLogger(__name__)
-logger.info(f"Logger initialized at {datetime.datetime.now()}")
+logger.info("Logger initialized at %s", datetime.datetime.now())
+if pubsub_config.PUBSUB_BACKEND != "local" and log_config.LOG_ROTATION != "external":
+    logger.warning(
+        "Several workers share %s but rotate it themselves; set LOG_ROTATION=external", log_filename
+    )
@@ -0,0 +1,15 @@
+"""Loader option profiles, one per response shape.
+
+Every endpoint serializing relationships applies the matching profile, so
+a page of N rows costs a fixed number of queries instead of 1 + N:
+many-to-one relations are joined in, collections are loaded with one
+extra SELECT ... IN per page. Read-only lists skip the ORM altogether,
+see db/projections.py.
+"""
+from sqlalchemy.orm import selectinload
+
+from db.models import User, UserRole
+
+# User.to_dict() + User.get_roles()
+USER_WITH_ROLES = (selectinload(User.user_roles).joinedload(UserRole.role),)
+
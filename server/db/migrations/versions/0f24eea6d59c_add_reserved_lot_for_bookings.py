@@ -0,0 +1,34 @@
+"""add reserved lot for bookings
+
+Revision ID: 0f24eea6d59c
+Revises: 828943060669
+Create Date: 2026-10-17 11:41:09.553120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0f24eea6d59c'
+down_revision: Union[str, Sequence[str], None] = '828943060669'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('booking') as batch_op:
+        batch_op.add_column(sa.Column('lot_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_booking_lot_id_parking_lot', 'parking_lot', ['lot_id'], ['id'], ondelete='SET NULL'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('booking') as batch_op:
+        batch_op.drop_constraint('fk_booking_lot_id_parking_lot', type_='foreignkey')
+        batch_op.drop_column('lot_id')
@@ -0,0 +1,44 @@
+"""add updated_at for parkings and devices
+
+Revision ID: 1fbbd5dfb2db
+Revises: 8c76c71ee86f
+Create Date: 2026-10-17 15:12:44.903517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1fbbd5dfb2db'
+down_revision: Union[str, Sequence[str], None] = '8c76c71ee86f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('parking', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('devices', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Best known last change for existing rows
+    op.execute("UPDATE parking SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    op.execute(
+        "UPDATE devices SET updated_at = "
+        "COALESCE(revoked_at, renewed_at, issued_at, CURRENT_TIMESTAMP)"
+    )
+
+    with op.batch_alter_table('parking') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+    with op.batch_alter_table('devices') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('devices') as batch_op:
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('parking') as batch_op:
+        batch_op.drop_column('updated_at')
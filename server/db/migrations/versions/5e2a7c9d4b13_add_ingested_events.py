@@ -0,0 +1,39 @@
+"""add ingested events
+
+Revision ID: 5e2a7c9d4b13
+Revises: 1fbbd5dfb2db
+Create Date: 2026-10-17 17:40:21.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2a7c9d4b13'
+down_revision: Union[str, Sequence[str], None] = '1fbbd5dfb2db'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ingested_event',
+        sa.Column('parking_id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.String(length=100), nullable=False),
+        sa.Column('type', sa.String(length=20), nullable=False),
+        sa.Column('result', sa.Text(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['parking_id'], ['parking.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('parking_id', 'event_id'),
+    )
+    op.create_index('ix_ingested_event_received_at', 'ingested_event', ['received_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ingested_event_received_at', table_name='ingested_event')
+    op.drop_table('ingested_event')
@@ -0,0 +1,46 @@
+"""add total_spots counter for parkings
+
+Revision ID: 828943060669
+Revises: a6d8fbc9b386
+Create Date: 2026-10-17 11:24:41.906215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '828943060669'
+down_revision: Union[str, Sequence[str], None] = 'a6d8fbc9b386'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'parking',
+        sa.Column('total_spots', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Start both counters from the actual lot rows
+    op.execute(
+        """
+        UPDATE parking
+        SET total_spots = (
+                SELECT COUNT(*) FROM parking_lot WHERE parking_lot.parking_id = parking.id
+            ),
+            available_spots = (
+                SELECT COUNT(*) FROM parking_lot
+                WHERE parking_lot.parking_id = parking.id AND parking_lot.status = 'free'
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('parking') as batch_op:
+        batch_op.drop_column('total_spots')
@@ -0,0 +1,45 @@
+"""add indexes for hot filters
+
+Revision ID: 8c76c71ee86f
+Revises: 0f24eea6d59c
+Create Date: 2026-10-17 14:05:32.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c76c71ee86f'
+down_revision: Union[str, Sequence[str], None] = '0f24eea6d59c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_booking_user_id_created_at', 'booking', ['user_id', 'created_at']),
+    ('ix_booking_parking_id_start', 'booking', ['parking_id', 'start']),
+    ('ix_booking_status_created_at', 'booking', ['status', 'created_at']),
+    ('ix_booking_created_at', 'booking', ['created_at']),
+    ('ix_booking_car_id', 'booking', ['car_id']),
+    ('ix_booking_lot_id', 'booking', ['lot_id']),
+    ('ix_parking_lot_parking_id_status_lot_index', 'parking_lot', ['parking_id', 'status', 'lot_index']),
+    ('ix_user_role_user_id_role_id', 'user_role', ['user_id', 'role_id']),
+    ('ix_user_role_role_id', 'user_role', ['role_id']),
+    ('ix_car_owner_id', 'car', ['owner_id']),
+    ('ix_devices_status', 'devices', ['status']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
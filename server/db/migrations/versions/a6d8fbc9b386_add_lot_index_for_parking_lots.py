@@ -0,0 +1,48 @@
+"""add lot_index for parking lots
+
+Revision ID: a6d8fbc9b386
+Revises: c96857de5261
+Create Date: 2026-10-17 11:12:04.318512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d8fbc9b386'
+down_revision: Union[str, Sequence[str], None] = 'c96857de5261'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('parking_lot', sa.Column('lot_index', sa.Integer(), nullable=True))
+
+    # Existing lots keep the position they had in the implicit id order
+    op.execute(
+        """
+        UPDATE parking_lot
+        SET lot_index = (
+            SELECT COUNT(*) FROM parking_lot AS earlier
+            WHERE earlier.parking_id = parking_lot.parking_id
+              AND earlier.id < parking_lot.id
+        )
+        """
+    )
+
+    with op.batch_alter_table('parking_lot') as batch_op:
+        batch_op.alter_column('lot_index', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_unique_constraint(
+            'uq_parking_lot_parking_id_lot_index', ['parking_id', 'lot_index']
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('parking_lot') as batch_op:
+        batch_op.drop_constraint('uq_parking_lot_parking_id_lot_index', type_='unique')
+        batch_op.drop_column('lot_index')
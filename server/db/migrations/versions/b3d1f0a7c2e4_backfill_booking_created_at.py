@@ -0,0 +1,32 @@
+"""backfill booking created_at
+
+Revision ID: b3d1f0a7c2e4
+Revises: 5e2a7c9d4b13
+Create Date: 2026-10-17 19:02:37.514920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d1f0a7c2e4'
+down_revision: Union[str, Sequence[str], None] = '5e2a7c9d4b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows from before c96857de5261 have no created_at; the booking's start is the best known value
+    op.execute("UPDATE booking SET created_at = COALESCE(start, CURRENT_TIMESTAMP) WHERE created_at IS NULL")
+    with op.batch_alter_table('booking') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('booking') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -1,6 +1,7 @@
 from datetime import datetime
 from sqlalchemy import (
     create_engine,
+    event,
     Column,
     String,
     Integer,
@@ -9,12 +10,25 @@ from sqlalchemy import (
     Text,
     DECIMAL,
     ForeignKey,
+    Index,
     UniqueConstraint,
 )
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker, scoped_session
 from config.config import db_config
 
 engine = create_engine(db_config.DB_CONNECTION, echo=False, future=True, pool_pre_ping=True)
+
+if engine.dialect.name == "sqlite":
+    # pysqlite starts transactions late and commits on RELEASE of the first
+    # SAVEPOINT, so begin_nested() would not nest. Let SQLAlchemy emit BEGIN.
+    @event.listens_for(engine, "connect")
+    def _sqlite_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
 SessionLocal = scoped_session(
     sessionmaker(bind=engine, autoflush=False, autocommit=False)
 )
@@ -118,6 +132,10 @@ class User(Base):
 
 class Car(Base):
     __tablename__ = "car"
+    __table_args__ = (
+        # /users/<id>/cars
+        Index("ix_car_owner_id", "owner_id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     owner_id = Column(String, ForeignKey("user.id"), nullable=False)
     brand = Column(String, nullable=False)
@@ -162,6 +180,11 @@ class Transaction(Base):
 
 class UserRole(Base):
     __tablename__ = "user_role"
+    __table_args__ = (
+        # Role lookups per user, and ?role= filters joining from the role side
+        Index("ix_user_role_user_id_role_id", "user_id", "role_id"),
+        Index("ix_user_role_role_id", "role_id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, ForeignKey("user.id"), nullable=False)
     role_id = Column(Integer, ForeignKey("role.id"), nullable=False)
@@ -177,11 +200,18 @@ class Parking(Base):
     latitude = Column(DECIMAL(9, 6), nullable=False)
     longitude = Column(DECIMAL(9, 6), nullable=False)
     capacity = Column(Integer, nullable=False)
+    # Counters kept in step with lot status transitions (see utils.parking_lots)
     available_spots = Column(Integer, nullable=False, default=0)
+    total_spots = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every UPDATE, including the counter updates; versions the cached GETs
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     parking_lots = relationship(
-        "ParkingLot", back_populates="parking", cascade="all, delete-orphan"
+        "ParkingLot",
+        back_populates="parking",
+        cascade="all, delete-orphan",
+        order_by="ParkingLot.lot_index",
     )
     bookings = relationship(
         "Booking", back_populates="parking", cascade="all, delete-orphan"
@@ -198,28 +228,42 @@ class Parking(Base):
                 "lng": float(self.longitude),
             },
             "availableSpots": self.available_spots,
-            "totalSpots": len(self.parking_lots),
+            "totalSpots": self.total_spots,
         }
 
-    def update_available_spots(self):
-        self.available_spots = sum(
-            1 for lot in self.parking_lots if lot.status == "free"
-        )
-
 
 class ParkingLot(Base):
     __tablename__ = "parking_lot"
+    __table_args__ = (
+        # Sensors address lots by (parking, index); also serves filter_by(parking_id)
+        UniqueConstraint("parking_id", "lot_index", name="uq_parking_lot_parking_id_lot_index"),
+        # First free lot of a parking (reserve_lot), free-lot checks
+        Index("ix_parking_lot_parking_id_status_lot_index", "parking_id", "status", "lot_index"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     status = Column(String, default="free")
     timestamp = Column(DateTime, default=datetime.utcnow)
     parking_id = Column(Integer, ForeignKey("parking.id"), nullable=False)
+    lot_index = Column(Integer, nullable=False)  # 0-based position within the parking
     parking = relationship("Parking", back_populates="parking_lots")
 
 
 class Booking(Base):
     __tablename__ = "booking"
+    __table_args__ = (
+        # A user's bookings, newest first
+        Index("ix_booking_user_id_created_at", "user_id", "created_at"),
+        # Bookings of a parking by time (admin filters, availability, car entering)
+        Index("ix_booking_parking_id_start", "parking_id", "start"),
+        # Admin list: ?status= sorted by creation, and the unfiltered default sort
+        Index("ix_booking_status_created_at", "status", "created_at"),
+        Index("ix_booking_created_at", "created_at"),
+        # Car joins and cascades on car / lot delete
+        Index("ix_booking_car_id", "car_id"),
+        Index("ix_booking_lot_id", "lot_id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
-    created_at = Column(DateTime, default=datetime.now())
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
     user_id = Column(String, ForeignKey("user.id"), nullable=False)
     car_id = Column(Integer, ForeignKey("car.id"), nullable=False)
     status = Column(String, nullable=False)
@@ -228,6 +272,8 @@ class Booking(Base):
     parking_id = Column(
         Integer, ForeignKey("parking.id"), nullable=False
     )  # <-- додав ForeignKey, щоб join працював
+    # Lot reserved for this booking (see utils.parking_lots.reserve_lot)
+    lot_id = Column(Integer, ForeignKey("parking_lot.id", ondelete="SET NULL"), nullable=True)
 
     user = relationship("User", back_populates="bookings")
     car = relationship(
@@ -265,6 +311,10 @@ class Booking(Base):
 
 class Device(Base):
     __tablename__ = "devices"
+    __table_args__ = (
+        # Revoked devices for the CRL
+        Index("ix_devices_status", "status"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     serial_number = Column(String(100), unique=True, nullable=False)
     token = Column(String(200), nullable=True)
@@ -275,6 +325,7 @@ class Device(Base):
     issued_at = Column(DateTime, nullable=True)
     renewed_at = Column(DateTime, nullable=True)
     revoked_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     parking = relationship("Parking", back_populates="devices")
 
     def to_dict(self):
@@ -304,5 +355,24 @@ class Device(Base):
         }
 
 
+class IngestedEvent(Base):
+    """Gate/sensor event already applied, by the controller's event id.
+
+    Lets a controller resend a batch after a lost response without the
+    events being applied twice; `result` is returned again for a resend.
+    """
+
+    __tablename__ = "ingested_event"
+    __table_args__ = (
+        # Purge of ids past the retention period
+        Index("ix_ingested_event_received_at", "received_at"),
+    )
+    parking_id = Column(Integer, ForeignKey("parking.id", ondelete="CASCADE"), primary_key=True)
+    event_id = Column(String(100), primary_key=True)
+    type = Column(String(20), nullable=False)
+    result = Column(Text, nullable=False)  # JSON
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
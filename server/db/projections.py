@@ -0,0 +1,195 @@
+"""Column projections for read-only list responses.
+
+A `Projection` knows, for every field of a list response, which columns
+it needs and how to build its value from them. `select` turns a filtered
+entity query into one selecting only the columns of the requested fields
+(all by default, giving the same dict as the model's `to_dict`), joining
+related tables only when a field needs them. Rows are plain tuples, so no
+instances are hydrated or tracked in the identity map.
+"""
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import request
+from sqlalchemy.orm import Session, aliased
+
+from db.models import User, UserRole, Role, Car, Parking, Booking, Device
+
+
+class InvalidFields(ValueError):
+    """`?fields=` names a field the response doesn't have."""
+
+
+class Field:
+    __slots__ = ("columns", "build", "join")
+
+    def __init__(self, columns: Sequence, build: Callable = None, join: Optional[str] = None):
+        self.columns = tuple(columns)
+        self.build = build or (lambda value: value)
+        self.join = join
+
+
+class Projection:
+    def __init__(self, fields: Dict[str, Field], joins: Dict[str, Callable] = None):
+        self.fields = fields
+        self.joins = joins or {}
+
+    def select(self, query, fields: Optional[Iterable[str]] = None, keys: Sequence = ()) -> Tuple:
+        """Return (projected query, row -> dict) for the given fields.
+
+        `keys` are extra columns selected under their own attribute name
+        (e.g. `Booking.id`, the sort column) for keyset pagination or
+        follow-up lookups; they are not serialized.
+        """
+        plan, columns, joined = [], [], set()
+        for name in fields if fields is not None else self.fields:
+            field = self.fields[name]
+            if field.join and field.join not in joined:
+                query = self.joins[field.join](query)
+                joined.add(field.join)
+            plan.append((name, len(columns), len(columns) + len(field.columns), field.build))
+            columns.extend(field.columns)
+
+        labeled = [column.label(f"f{i}") for i, column in enumerate(columns)]
+        labeled += [key.label(key.key) for key in keys]
+
+        def serialize(row) -> dict:
+            return {name: build(*row[start:end]) for name, start, end, build in plan}
+
+        return query.with_entities(*labeled), serialize
+
+
+def requested_fields(projection: Projection, extra: Sequence[str] = ()) -> Optional[List[str]]:
+    """Field names from `?fields=a,b`, or None for all of them."""
+    fields = request.args.get("fields")
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in projection.fields and name not in extra]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def _minutes(value):
+    # Same text as strftime("%Y-%m-%dT%H:%M") for the naive datetimes we store
+    return value.isoformat(timespec="minutes") if value else None
+
+
+def _coordinates(lat, lng):
+    return {"lat": float(lat), "lng": float(lng)}
+
+
+# --- Parkings: Parking.to_dict() ---
+def _parking_fields(parking) -> Dict[str, Field]:
+    return {
+        "id": Field([parking.id]),
+        "name": Field([parking.name]),
+        "address": Field([parking.location]),
+        "coordinates": Field([parking.latitude, parking.longitude], _coordinates),
+        "availableSpots": Field([parking.available_spots]),
+        "totalSpots": Field([parking.total_spots]),
+    }
+
+
+PARKING = Projection(_parking_fields(Parking))
+
+
+# --- Cars: Car.to_dict() ---
+def _car_fields(car) -> Dict[str, Field]:
+    return {
+        "id": Field([car.id]),
+        "number": Field([car.license_plate]),
+        "brand": Field([car.brand]),
+        "model": Field([car.model]),
+        "color": Field([car.color]),
+    }
+
+
+CAR = Projection(_car_fields(Car))
+
+
+# --- Bookings: Booking.to_dict_extended() ---
+def _nested(fields: Dict[str, Field], join: str) -> Field:
+    """One field holding a whole related object, None if there is none."""
+    columns = [column for field in fields.values() for column in field.columns]
+    plan, start = [], 0
+    for name, field in fields.items():
+        plan.append((name, start, start + len(field.columns), field.build))
+        start += len(field.columns)
+
+    def build(*values):
+        if values[0] is None:
+            return None
+        return {name: b(*values[s:e]) for name, s, e, b in plan}
+
+    return Field(columns, build, join)
+
+
+# Aliased, so the joins don't clash with a join the filters already added
+_car = aliased(Car, name="projected_car")
+_parking = aliased(Parking, name="projected_parking")
+
+BOOKING_EXTENDED = Projection(
+    {
+        "id": Field([Booking.id]),
+        "userId": Field([Booking.user_id]),
+        "carId": Field([Booking.car_id]),
+        "parkingId": Field([Booking.parking_id]),
+        "carObj": _nested(_car_fields(_car), "car"),
+        "parkingObj": _nested(_parking_fields(_parking), "parking"),
+        "status": Field([Booking.status]),
+        "start": Field([Booking.start], _minutes),
+        "end": Field([Booking.end], _minutes),
+    },
+    joins={
+        "car": lambda query: query.outerjoin(_car, Booking.car_id == _car.id),
+        "parking": lambda query: query.outerjoin(_parking, Booking.parking_id == _parking.id),
+    },
+)
+
+
+# --- Users: User.to_dict(); "roles" is added by the route ---
+USER = Projection(
+    {
+        "id": Field([User.id]),
+        "name": Field([User.name]),
+        "email": Field([User.email]),
+        "phoneNumber": Field([User.phone_number]),
+        "avatarUrl": Field([User.avatar_url]),
+        "createdAt": Field([User.created_at]),
+    }
+)
+
+
+def roles_by_user(db: Session, user_ids: Iterable[str]) -> Dict[str, List[str]]:
+    """Stored role names of a page of users, in one query."""
+    roles = defaultdict(list)
+    user_ids = list(user_ids)
+    if user_ids:
+        rows = (
+            db.query(UserRole.user_id, Role.name)
+            .join(Role, Role.id == UserRole.role_id)
+            .filter(UserRole.user_id.in_(user_ids))
+            .order_by(UserRole.id)
+        )
+        for user_id, name in rows:
+            roles[user_id].append(name)
+    return roles
+
+
+# --- Devices: Device.to_dict() ---
+DEVICE = Projection(
+    {
+        "id": Field([Device.id]),
+        "serial_number": Field([Device.serial_number]),
+        "token": Field([Device.token]),
+        "status": Field([Device.status]),
+        "issued": Field([Device.issued]),
+        "parking_id": Field([Device.parking_id]),
+        "cert_serial": Field([Device.cert_serial]),
+        "issued_at": Field([Device.issued_at], _minutes),
+        "renewed_at": Field([Device.renewed_at], _minutes),
+        "revoked_at": Field([Device.revoked_at], _minutes),
+    }
+)
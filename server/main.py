@@ -1,6 +1,7 @@
 import time
 import uuid
-import json
+import random
+import logging
 from flask import Flask, g, request
 from flask_cors import CORS
 from flasgger import Swagger
@@ -15,13 +16,30 @@ from routes.certificates import certificates_bp
 from routes.subscriptions import subscription_bp
 
 from config.logs_config import logger
-from auth.validation import validate_bearer_token
+from config.config import log_config
+from auth.validation import OIDC_METADATA
+from auth.principal import authenticate_request, format_server_timing, TIMINGS_KEY
 from whiskey import SimpleMiddleware
 from db.models import init_db, SessionLocal
+from utils.json_provider import OrjsonProvider
+from utils.compression import compress_response
+
+# Credentials never reach the logs, not even in sampled header dumps
+REDACTED_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie", "x-api-key"}
+
+
+def redact_headers(headers) -> dict:
+    return {
+        name: "[REDACTED]" if name.lower() in REDACTED_HEADERS else value
+        for name, value in headers.items()
+    }
 
 
 def create_app():
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    # Registered first, before CORS adds its own, so it runs after every other after_request hook
+    app.after_request(compress_response)
     CORS(app)
     # app.wsgi_app = SimpleMiddleware(app.wsgi_app)
 
@@ -41,57 +59,86 @@ def create_app():
     }
     Swagger(app, config=swagger_config)
 
+    # Load OIDC metadata in the background so the first request doesn't wait
+    OIDC_METADATA.prewarm()
+
     # --- Middleware / hooks ---
+    @app.before_request
+    def assign_request_id():
+        """Set request id first, so every log line of the request carries it"""
+        request.start_time = time.time()
+        g.request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+
     @app.before_request
     def create_session():
         g.db = SessionLocal()
     
     @app.before_request
     def extract_user_from_token():
-        """Extract user_id from Bearer token and set it in g"""
-        auth_header = request.headers.get("Authorization", "")
-        if auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            try:
-                decoded = validate_bearer_token(token)
-                if decoded:
-                    # Extract user ID from token (usually in 'oid' or 'sub' claim)
-                    user_id = decoded.get("oid") or decoded.get("sub") or decoded.get("user_id")
-                    if user_id:
-                        g.user_id = user_id
-                    logger.debug(f"Extracted user_id from token: {user_id}")
-            except Exception as e:
-                logger.debug(f"Could not extract user from token: {e}")
-                g.user_id = None
-        else:
-            g.user_id = None
+        """Authenticate the request once and expose the principal in g"""
+        principal = authenticate_request(request.environ)
+        g.principal = principal
+        g.user_id = principal.user_id if principal else None
+        if principal:
+            g.token_data = principal.claims
+            logger.debug(f"Extracted user_id from token: {principal.user_id}")
 
     @app.before_request
     def log_request_info():
         """Logs request details before processing."""
-        request.start_time = time.time()
-        g.request_id = str(uuid.uuid4())
-        try:
-            data = json.loads(request.data.decode("utf-8") or "{}")
-        except Exception:
-            data = {}
+        # Sampled headers/body only; the access line is written on response
+        g.log_headers = random.random() < log_config.LOG_HEADERS_SAMPLE_RATE
+        log_body = random.random() < log_config.LOG_BODY_SAMPLE_RATE
+        if not (g.log_headers or log_body) or not logger.isEnabledFor(logging.INFO):
+            return
+
+        data = None
+        if log_body:
+            # Same fast parser as request.get_json() in the views
+            data = request.get_json(force=True, silent=True) or {}
+            data = app.json.dumps(data)[: log_config.LOG_BODY_MAX_BYTES]
         logger.info(
-            f"Request: {request.method} {request.path} {json.dumps(data, separators=(':', ','))} "
-            f"from {request.remote_addr} | Headers: {dict(request.headers)}"
+            "Request: %s %s %s | Headers: %s",
+            request.method,
+            request.path,
+            data if data is not None else "-",
+            redact_headers(request.headers) if g.log_headers else "-",
+            extra={"method": request.method, "path": request.path},
         )
 
     @app.after_request
     def log_response_info(response):
-        duration = time.time() - request.start_time
+        response.headers["X-Request-ID"] = g.request_id
+        if not logger.isEnabledFor(logging.INFO):
+            return response
+        duration_ms = round((time.time() - request.start_time) * 1000, 3)
         try:
+            fmt, args = "%s %s %s %.3fms", [request.method, request.path, response.status_code, duration_ms]
+            if g.get("log_headers"):
+                fmt, args = fmt + " | Headers: %s", args + [redact_headers(response.headers)]
             logger.info(
-                f"Response: {response.status} for {request.method} {request.path} "
-                f"from {request.remote_addr} | Duration: {duration:.4f}s | Headers: {dict(response.headers)}"
+                fmt,
+                *args,
+                extra={
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration_ms": duration_ms,
+                    "remote_addr": request.remote_addr,
+                },
             )
         except Exception as e:
             logger.error(f"Error logging response data: {e}")
         return response
 
+    @app.after_request
+    def add_auth_timing(response):
+        """Expose what authentication cost for this request"""
+        timings = request.environ.get(TIMINGS_KEY)
+        if timings:
+            response.headers.add("Server-Timing", format_server_timing(timings))
+        return response
+
     @app.teardown_request
     def shutdown_session(exception=None):
         db = g.pop("db", None)
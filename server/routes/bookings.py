@@ -1,10 +1,14 @@
 from datetime import datetime
 from flask import Blueprint, request, jsonify, g
-from sqlalchemy.orm import joinedload
 from db.models import User, Booking, Parking
 from cast_types.g_types import DbSessionType
 from typing import cast
 from auth.roles import hasRole
+from utils.parking_lots import reserve_lot, release_booking_lot, CLOSED_STATUSES
+from utils.availability import availability_index
+from utils.pagination import keyset_page, cursor_meta, offset_page, InvalidCursor
+from utils.counts import get_total
+from db.projections import BOOKING_EXTENDED, requested_fields, InvalidFields
 
 booking_bp = Blueprint("booking_bp", __name__)
 
@@ -16,6 +20,18 @@ SORT_MAP = {
 }
 
 
+def _parse_sort(sort, default: str):
+    """Split a `sort` arg like "-start" into (key, descending).
+
+    Unknown keys fall back to `default`; used by cursor mode, which always
+    needs a well-defined order.
+    """
+    key = (sort or "").lstrip("-")
+    if key not in SORT_MAP:
+        sort, key = default, default.lstrip("-")
+    return key, sort.startswith("-")
+
+
 ## Get bookings for a user
 @booking_bp.route("/<user_id>", methods=["GET"])
 def get_user_bookings(user_id):
@@ -26,7 +42,6 @@ def get_user_bookings(user_id):
         page = request.args.get("page", default=1, type=int)
         per_page = request.args.get("per_page", default=10, type=int)
         sort = request.args.get("sort")   # e.g. "start", "-end"
-        offset = (page - 1) * per_page
 
         query = db.query(Booking).filter_by(user_id=user_id)
 
@@ -40,7 +55,23 @@ def get_user_bookings(user_id):
         if status:
             query = query.filter(Booking.status == status)
 
-        total = query.count()
+        fields = requested_fields(BOOKING_EXTENDED)  # e.g. "id,start,end,parkingId"
+        total = get_total(db, query, ("booking", "parking"))
+
+        # Opt-in keyset pagination: ?cursor= (empty for the first page)
+        cursor = request.args.get("cursor")
+        if cursor is not None:
+            key, descending = _parse_sort(sort, default="-created_at")
+            projected, serialize = BOOKING_EXTENDED.select(query, fields, keys=(Booking.id, SORT_MAP[key]))
+            bookings, next_cursor = keyset_page(
+                projected, per_page, cursor, Booking.id, key, SORT_MAP[key], descending
+            )
+            result = {
+                "bookings": [serialize(booking) for booking in bookings],
+                "total": total,
+                **cursor_meta(per_page, next_cursor),
+            }
+            return jsonify(result), 200
 
         if sort:
             direction = sort.startswith("-")
@@ -53,26 +84,18 @@ def get_user_bookings(user_id):
             # default sorting by created_at DESC
             query = query.order_by(Booking.created_at.desc())
 
-        bookings = (
-            query
-            .offset(offset)
-            .limit(per_page)
-            .all()
-        )
+        projected, serialize = BOOKING_EXTENDED.select(query, fields)
+        bookings, meta = offset_page(projected, page, per_page, total)
 
         result = {
-            "bookings": [booking.to_dict_extended() for booking in bookings],
-            "total": total,
-            "page": page,
-            "pages": (total + per_page - 1) // per_page,
-            "has_next": offset + per_page < total,
-            "has_prev": page > 1,
-            "next_page": page + 1 if offset + per_page < total else None,
-            "prev_page": page - 1 if page > 1 else None,
+            "bookings": [serialize(booking) for booking in bookings],
+            **meta,
         }
 
         return jsonify(result), 200
 
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -96,18 +119,10 @@ def get_all_bookings():
 
         page = request.args.get("page", default=1, type=int)
         per_page = request.args.get("per_page", default=10, type=int)
-        offset = (page - 1) * per_page
 
         sort = request.args.get("sort")
 
-        query = (
-            db.query(Booking)
-            .options(
-                joinedload(Booking.user),
-                joinedload(Booking.car),
-                joinedload(Booking.parking)
-            )
-        )
+        query = db.query(Booking)
 
         # START of filters
         if user_id:
@@ -135,7 +150,23 @@ def get_all_bookings():
             query = query.filter(Booking.end <= end_to)
         ## END of filters
 
-        total = query.count()
+        fields = requested_fields(BOOKING_EXTENDED)  # e.g. "id,start,end,parkingId"
+        total = get_total(db, query, ("booking", "parking"))
+
+        # Opt-in keyset pagination: ?cursor= (empty for the first page)
+        cursor = request.args.get("cursor")
+        if cursor is not None:
+            key, descending = _parse_sort(sort, default="created_at")
+            projected, serialize = BOOKING_EXTENDED.select(query, fields, keys=(Booking.id, SORT_MAP[key]))
+            bookings, next_cursor = keyset_page(
+                projected, per_page, cursor, Booking.id, key, SORT_MAP[key], descending
+            )
+            result = {
+                "bookings": [serialize(b) for b in bookings],
+                "total": total,
+                **cursor_meta(per_page, next_cursor),
+            }
+            return jsonify(result), 200
 
         if sort:
             direction = sort.startswith("-")
@@ -148,26 +179,19 @@ def get_all_bookings():
             query = query.order_by(Booking.created_at.asc())
 
         # Pagination
-        bookings = (
-            query.offset(offset)
-                 .limit(per_page)
-                 .all()
-        )
+        projected, serialize = BOOKING_EXTENDED.select(query, fields)
+        bookings, meta = offset_page(projected, page, per_page, total)
 
         # Serialize
         result = {
-            "bookings": [b.to_dict_extended() for b in bookings],
-            "total": total,
-            "page": page,
-            "pages": (total + per_page - 1) // per_page,
-            "has_next": offset + per_page < total,
-            "has_prev": page > 1,
-            "next_page": page + 1 if offset + per_page < total else None,
-            "prev_page": page - 1 if page > 1 else None,
+            "bookings": [serialize(b) for b in bookings],
+            **meta,
         }
 
         return jsonify(result), 200
 
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -180,18 +204,20 @@ def create_booking():
             return jsonify({"error": "No data provided"}), 400
         user_id = data.get("userId")  # or g.user.id
 
-        parking = g.db.query(Parking).filter_by(id=data["parkingId"]).first()
-        parking.update_available_spots()
-        if not parking:
+        parking_id = g.db.query(Parking.id).filter_by(id=data["parkingId"]).scalar()
+        if parking_id is None:
             return jsonify({"error": "Parking not found"}), 404
-        if parking.available_spots <= 0:
-            return jsonify({"error": "No available spots"}), 400
 
-        parking.available_spots -= 1
+        # Conditional UPDATE on a concrete lot, no read-modify-write of the counter
+        lot_id = reserve_lot(g.db, parking_id)
+        if lot_id is None:
+            g.db.rollback()
+            return jsonify({"error": "No available spots"}), 400
 
         new_booking = Booking(
             user_id=user_id,
-            parking_id=data["parkingId"],
+            parking_id=parking_id,
+            lot_id=lot_id,
             car_id=data["carId"],
             start=datetime.strptime(data["start"], "%Y-%m-%dT%H:%M"),
             end=datetime.strptime(data["end"], "%Y-%m-%dT%H:%M"),
@@ -200,6 +226,7 @@ def create_booking():
 
         g.db.add(new_booking)
         g.db.commit()
+        availability_index.booking_changed(new_booking)
 
         ##TODO Calculate price and create transaction if needed
 
@@ -228,18 +255,17 @@ def update_booking(booking_id):
             old_status = booking.status
             booking.status = data["status"]
 
-            # Handle cancellation: return spot
-            if data["status"] == "cancelled" and old_status != "cancelled":
-                parking = g.db.query(Parking).filter_by(id=booking.parking_id).first()
-                if parking:
-                    parking.available_spots += 1
+            # Cancelled or completed: return the spot
+            if data["status"] in CLOSED_STATUSES and old_status not in CLOSED_STATUSES:
+                release_booking_lot(g.db, booking)
 
         if "start" in data:
-            booking.start_time = data["start"]
+            booking.start = datetime.strptime(data["start"], "%Y-%m-%dT%H:%M")
         if "end" in data:
-            booking.end_time = data["end"]
+            booking.end = datetime.strptime(data["end"], "%Y-%m-%dT%H:%M")
 
         g.db.commit()
+        availability_index.booking_changed(booking)
         return jsonify(booking.to_dict()), 200
     except Exception as e:
         g.db.rollback()
@@ -257,8 +283,10 @@ def delete_booking(booking_id):
         if not booking:
             return jsonify({"error": "Booking not found"}), 404
 
+        release_booking_lot(g.db, booking)
         g.db.delete(booking)
         g.db.commit()
+        availability_index.booking_changed(booking, deleted=True)
         return "", 204  # No Content
     except Exception as e:
         g.db.rollback()
@@ -1,11 +1,12 @@
 import os
-from datetime import datetime
-from flask import Blueprint, request, jsonify, g
+from datetime import datetime, timezone
+from flask import Blueprint, Response, request, jsonify, g
 
 from config.logs_config import logger
 from config.config import ca_config
 from db.models import Device
 from utils.CA_sign import sign_csr, generate_crl
+from utils.http_cache import Validators, PUBLIC_CRL
 
 from typing import cast
 from cast_types.g_types import DbSessionType
@@ -91,5 +92,17 @@ def get_crl():
     CRL_FILE = ca_config.CRL_FILE
     if not os.path.exists(CRL_FILE):
         generate_crl(db)
+
+    # The file is rewritten on every revocation, so its stat versions it
+    stat = os.stat(CRL_FILE)
+    validators = Validators(
+        (stat.st_mtime_ns, stat.st_size),
+        datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+        PUBLIC_CRL,
+    )
+    not_modified = validators.not_modified()
+    if not_modified:
+        return not_modified
     with open(CRL_FILE, "r") as f:
-        return f.read(), 200, {"Content-Type": "application/x-pem-file"}
+        response = Response(f.read(), content_type="application/x-pem-file")
+    return validators.apply(response), 200
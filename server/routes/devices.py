@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, g
 from db.models import Device
+from db.projections import DEVICE, requested_fields, InvalidFields
+from utils.http_cache import Validators, PRIVATE
 from typing import cast
 from cast_types.g_types import DbSessionType
 
@@ -53,7 +55,11 @@ def get_device(serial_number):
         if not device:
             return jsonify({"error": "Device not found"}), 404
 
-        return jsonify(device.to_dict()), 200
+        validators = Validators(device.updated_at, device.updated_at, PRIVATE)
+        not_modified = validators.not_modified()
+        if not_modified:
+            return not_modified
+        return validators.apply(jsonify(device.to_dict())), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -63,10 +69,13 @@ def get_device(serial_number):
 def list_devices():
     db: DbSessionType = cast(DbSessionType, g.db)
     try:
-        devices = db.query(Device).all()
-        result = [d.to_dict() for d in devices]
+        projected, serialize = DEVICE.select(db.query(Device), requested_fields(DEVICE))
+        result = [serialize(d) for d in projected.all()]
         return jsonify(result), 200
 
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
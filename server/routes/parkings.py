@@ -1,12 +1,33 @@
-from flask import Blueprint, request, jsonify, g
-from db.models import Parking, ParkingLot, Booking, Car
+import io
+import csv
+import math
+import queue
+from flask import Blueprint, Response, request, jsonify, g, current_app
+from db.models import Parking, Booking
 from datetime import datetime
 from typing import cast
 from cast_types.g_types import DbSessionType
+from utils.event_journal import lot_status_journal
+from utils.availability import availability_index
+from utils.gate_index import gate_index
+from utils.pagination import keyset_page, cursor_meta, offset_page, InvalidCursor
+from utils.counts import get_total
+from db.projections import PARKING, requested_fields, InvalidFields
+from utils.http_cache import Validators
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from utils.parking_lots import LOT_STATUSES, set_lot_status, new_parking, insert_lots, release_booking_lot
+from utils.sensor_events import ingest_events
+from utils.live_availability import availability_broadcaster, RESYNC, TooManyStreams
+from utils.geo import METERS_PER_DEGREE_LAT, parse_bbox, distance_m, bbox_around
+from utils.spatial_index import spatial_index
+from config.config import events_config, stream_config, geo_config
 
 
 parking_bp = Blueprint("parking_bp", __name__)
 
+IMPORT_CHUNK_SIZE = 500
+
 
 #   Add this line to every endpoint for enabling hints
 #   db: DbSessionType = cast(DbSessionType, g.db)
@@ -23,24 +44,213 @@ def get_parkings():
         query = db.query(Parking)
         if name is not None:
             query.filter(Parking.name == name)
-        offset = (page - 1) * per_page
-        total = query.count()
-        parkings = query.offset(offset).limit(per_page).all()
-        result = {
-            "parkings": [parking.to_dict() for parking in parkings],
-            "total": total,
-            "page": page,
-            "pages": (total + per_page - 1) // per_page,
-            "has_next": offset + per_page < total,
-            "has_prev": page > 1,
-            "next_page": page + 1 if offset + per_page < total else None,
-            "prev_page": page - 1 if page > 1 else None,
-        }
-        return jsonify(result), 200
+        fields = requested_fields(PARKING)  # e.g. "id,coordinates,availableSpots" for map pins
+
+        # Any insert, update or delete in the set changes the newest updated_at or the count.
+        # No Last-Modified: a delete leaves max(updated_at) as it was, only the ETag sees it
+        last_modified, count = query.with_entities(func.max(Parking.updated_at), func.count(Parking.id)).one()
+        validators = Validators((last_modified, count), None)
+        not_modified = validators.not_modified()
+        if not_modified:
+            return not_modified
+
+        total = get_total(db, query, ("parking",), count=count)
+
+        # Opt-in keyset pagination: ?cursor= (empty for the first page)
+        cursor = request.args.get("cursor")
+        if cursor is not None:
+            projected, serialize = PARKING.select(query, fields, keys=(Parking.id,))
+            parkings, next_cursor = keyset_page(projected, per_page, cursor, Parking.id)
+            result = {
+                "parkings": [serialize(parking) for parking in parkings],
+                "total": total,
+                **cursor_meta(per_page, next_cursor),
+            }
+            return validators.apply(jsonify(result)), 200
+
+        projected, serialize = PARKING.select(query, fields)
+        parkings, meta = offset_page(projected, page, per_page, total)
+        result = {"parkings": [serialize(parking) for parking in parkings], **meta}
+        return validators.apply(jsonify(result)), 200
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _ranked_parkings(db, hits, limit, fields, center, region, radius=None):
+    """Parkings for (distance, id) hits, nearest first, each with its
+    `distance` in meters from `center`.
+
+    With `?sort=free` the most free spots come first (then the nearest).
+    That ranking runs in SQL over `region` (and `radius`), so only `limit`
+    rows come back however many parkings the search covers.
+    """
+    lat, lng = center
+    by_free = request.args.get("sort") == "free"
+    query = db.query(Parking)
+    if by_free:
+        # Equirectangular distance in degrees of latitude; exact enough at search radii
+        d_lat = Parking.latitude - lat
+        d_lng = (Parking.longitude - lng) * math.cos(math.radians(lat))
+        spread = d_lat * d_lat + d_lng * d_lng
+        query = query.filter(
+            Parking.latitude.between(region.min_lat, region.max_lat),
+            Parking.longitude.between(region.min_lng, region.max_lng),
+        )
+        if radius is not None:
+            query = query.filter(spread <= (radius / METERS_PER_DEGREE_LAT) ** 2)
+        query = query.order_by(Parking.available_spots.desc(), spread, Parking.id).limit(limit)
+    else:
+        hits = hits[:limit]
+        query = query.filter(Parking.id.in_([parking_id for _, parking_id in hits]))
+    columns = [name for name in fields if name != "distance"] if fields is not None else None
+    projected, serialize = PARKING.select(
+        query, columns, keys=(Parking.id, Parking.latitude, Parking.longitude)
+    )
+    rows = projected.all()
+    if not by_free:
+        by_id = {row.id: row for row in rows}
+        rows = [by_id[parking_id] for _, parking_id in hits if parking_id in by_id]
+
+    result = []
+    for row in rows:
+        parking = serialize(row)
+        if fields is None or "distance" in fields:
+            parking["distance"] = round(distance_m(lat, lng, float(row.latitude), float(row.longitude)))
+        result.append(parking)
+    return result
+
+
+def _result_limit():
+    limit = request.args.get("limit", default=20, type=int)
+    return max(1, min(limit, geo_config.GEO_MAX_RESULTS))
+
+
+## Parkings near a point
+@parking_bp.route("/near", methods=["GET"])
+def get_parkings_near():
+    """Parkings within `radius` meters of lat/lng, nearest first.
+
+    `?lat=&lng=&radius=2000&limit=20`, `&sort=free` ranks by free spots
+    (then distance), `&fields=` as on GET /parkings plus `distance`.
+    Served from the in-memory grid in utils.spatial_index; `sort=free`
+    is ranked by the database.
+    """
+    db: DbSessionType = cast(DbSessionType, g.db)
+    lat = request.args.get("lat", type=float)
+    lng = request.args.get("lng", type=float)
+    radius = request.args.get("radius", default=2000, type=float)
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({"error": "lat and lng are required coordinates"}), 400
+    if not 0 < radius <= geo_config.GEO_MAX_RADIUS:
+        return jsonify({"error": f"radius must be in (0, {geo_config.GEO_MAX_RADIUS}] meters"}), 400
+
+    try:
+        fields = requested_fields(PARKING, extra=("distance",))
+        hits = spatial_index.near(db, lat, lng, radius)
+        parkings = _ranked_parkings(
+            db, hits, _result_limit(), fields, (lat, lng), bbox_around(lat, lng, radius), radius
+        )
+        return jsonify({"parkings": parkings, "total": len(hits)}), 200
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+## Parkings inside a map view
+@parking_bp.route("/within", methods=["GET"])
+def get_parkings_within():
+    """Parkings inside `?bbox=minLng,minLat,maxLng,maxLat`.
+
+    Ranked by distance from the box center (`distance`), or with
+    `&sort=free` by free spots; `limit` (default 20, at most
+    GEO_MAX_RESULTS) caps the pins, `total` counts all in the box.
+    """
+    db: DbSessionType = cast(DbSessionType, g.db)
+    try:
+        bbox = parse_bbox(request.args.get("bbox"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if bbox is None:
+        return jsonify({"error": "bbox is required"}), 400
+
+    try:
+        fields = requested_fields(PARKING, extra=("distance",))
+        lat, lng = bbox.center
+        hits = sorted(
+            (distance_m(lat, lng, p_lat, p_lng), parking_id)
+            for parking_id, p_lat, p_lng in spatial_index.within(db, bbox)
+        )
+        parkings = _ranked_parkings(db, hits, _result_limit(), fields, (lat, lng), bbox)
+        return jsonify({"parkings": parkings, "total": len(hits)}), 200
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+## Live availability (Server-Sent Events)
+@parking_bp.route("/stream", methods=["GET"])
+def stream_availability():
+    """Push `availableSpots` changes instead of polling GET /parkings.
+
+    Watch `?ids=1,2,3`, `?bbox=minLng,minLat,maxLng,maxLat`, or every
+    parking without either. The stream opens with a `snapshot` event of
+    the current counters, then sends `availability` events holding the
+    parkings that changed: [{"id", "availableSpots", "totalSpots"}].
+    A client that falls behind gets a new `snapshot`.
+
+    A stream holds a worker thread for as long as it is open; past
+    STREAM_MAX_CLIENTS per worker new streams get 503 and should retry.
+    """
+    try:
+        ids = request.args.get("ids")
+        ids = {int(part) for part in ids.split(",") if part} if ids is not None else None
+        bbox = parse_bbox(request.args.get("bbox"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid ids or bbox: {e}"}), 400
+    if ids is not None and len(ids) > stream_config.STREAM_MAX_IDS:
+        return jsonify({"error": f"At most {stream_config.STREAM_MAX_IDS} ids per stream"}), 400
+
+    dumps = current_app.json.dumps
+
+    def message(event, data):
+        return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+    # Subscribe before the snapshot, so no change falls between the two
+    try:
+        subscription = availability_broadcaster.subscribe(ids, bbox)
+    except TooManyStreams as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+
+    def events():
+        try:
+            yield "retry: 3000\n\n"
+            yield message("snapshot", availability_broadcaster.snapshot(subscription))
+            while True:
+                try:
+                    deltas = subscription.queue.get(timeout=stream_config.STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # Keeps proxies from closing an idle stream, and finds gone clients
+                    yield ": keep-alive\n\n"
+                    continue
+                if deltas is RESYNC:
+                    yield message("snapshot", availability_broadcaster.snapshot(subscription))
+                else:
+                    yield message("availability", deltas)
+        finally:
+            availability_broadcaster.unsubscribe(subscription)
+
+    response = Response(events(), mimetype="text/event-stream")
+    # Also when the client is gone before the first chunk
+    response.call_on_close(lambda: availability_broadcaster.unsubscribe(subscription))
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return response
+
+
 ## Get parking by ID
 @parking_bp.route("/<int:parking_id>", methods=["GET"])
 def get_parking(parking_id):
@@ -48,7 +258,32 @@ def get_parking(parking_id):
         parking = g.db.query(Parking).filter_by(id=parking_id).first()
         if not parking:
             return jsonify({"error": "Parking not found"}), 404
-        return jsonify(parking.to_dict()), 200
+        validators = Validators(parking.updated_at, parking.updated_at)
+        not_modified = validators.not_modified()
+        if not_modified:
+            return not_modified
+        return validators.apply(jsonify(parking.to_dict())), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+## Free spots of a parking during a time window
+@parking_bp.route("/<int:parking_id>/availability", methods=["GET"])
+def get_parking_availability(parking_id):
+    db: DbSessionType = cast(DbSessionType, g.db)
+    try:
+        t_from = datetime.strptime(request.args["from"], "%Y-%m-%dT%H:%M")
+        t_to = datetime.strptime(request.args["to"], "%Y-%m-%dT%H:%M")
+    except (KeyError, ValueError):
+        return jsonify({"error": "from and to are required as YYYY-MM-DDTHH:MM"}), 400
+    if t_from >= t_to:
+        return jsonify({"error": "from must be before to"}), 400
+
+    try:
+        result = availability_index.query(db, parking_id, t_from, t_to)
+        if result is None:
+            return jsonify({"error": "Parking not found"}), 404
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -59,28 +294,19 @@ def create_parking():
     # if g.user.role != "admin":
     #     return jsonify({"error": "Forbidden"}), 403
 
-    data = request.get_json()
+    data = request.get_json(silent=True)
     try:
-        parking = Parking(
-            name=data.get("name", "Default Parking"),
-            location=data["location"],
-            latitude=data["latitude"],
-            longitude=data["longitude"],
-            capacity=data["capacity"],
-            available_spots=data[
-                "available_spots"
-            ],  # Initially, all spots are available
-            created_at=datetime.utcnow(),
-        )
+        parking = new_parking(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    try:
+        # One transaction: the parking row plus a single bulk INSERT of its lots
         g.db.add(parking)
+        g.db.flush()
+        insert_lots(g.db, [parking])
         g.db.commit()
 
-        for _ in range(parking.capacity):
-            parking_lot = ParkingLot(status="free", parking_id=parking.id)
-            g.db.add(parking_lot)
-            g.db.commit()
-
         return (
             jsonify(
                 {
@@ -101,6 +327,55 @@ def create_parking():
         return jsonify({"error": str(e)}), 500
 
 
+## Bulk import parkings from a JSON array or CSV
+@parking_bp.route("/import", methods=["POST"])
+def import_parkings():
+    """Create many parkings with their lots in one transaction.
+
+    Accepts a JSON array of parking objects or `text/csv` with the columns
+    name, location, latitude, longitude, capacity. CSV is read from the
+    request stream row by row, and rows are inserted in chunks.
+    """
+    db: DbSessionType = cast(DbSessionType, g.db)
+
+    if request.mimetype == "text/csv":
+        stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        rows = csv.DictReader(stream)
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({"error": "Expected a JSON array or text/csv body"}), 400
+
+    created_ids = []
+    chunk = []
+
+    def flush_chunk():
+        db.add_all(chunk)
+        db.flush()
+        insert_lots(db, chunk)
+        created_ids.extend(parking.id for parking in chunk)
+        chunk.clear()
+
+    row_number = 0
+    try:
+        for row_number, row in enumerate(rows, start=1):
+            try:
+                chunk.append(new_parking(row))
+            except (KeyError, TypeError, ValueError) as e:
+                db.rollback()
+                return jsonify({"error": f"Invalid row {row_number}: {e}"}), 400
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                flush_chunk()
+        if chunk:
+            flush_chunk()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        return jsonify({"error": f"Import failed near row {row_number}: {e}"}), 500
+
+    return jsonify({"created": len(created_ids), "ids": created_ids}), 201
+
+
 # PATCH Parking
 @parking_bp.route("/<string:parking_id>", methods=["PATCH"])
 def update_parking(parking_id):
@@ -154,26 +429,28 @@ def delete_parking(parking_id):
 # PATCH parking lot
 @parking_bp.route("<string:parking_id>/lot/<int:lot_index>", methods=["PATCH"])
 def update_parking_lot_status(parking_id, lot_index):
-    options = ("taken", "free")
     db: DbSessionType = cast(DbSessionType, g.db)
 
     data = request.get_json()
 
-    # God, excuse me for this awfuł shit hard coding
-    # May me never do this level of logging for another pure soul
-    with open("parking_lot_updating.log", 'a') as file:
-        file.writelines(f"\n{datetime.now()} | {parking_id}:{lot_index} | {request.data.decode()}")
+    # Buffered; written and fsynced in batches by the journal thread
+    lot_status_journal.append(
+        {"parking_id": parking_id, "lot_index": lot_index, "payload": data}
+    )
 
-    parking_lots: list[ParkingLot] = db.query(ParkingLot).filter_by(parking_id=parking_id)
-    if data["status"] in options:
-        parking_lots[lot_index].status = data["status"]
-        db.commit()
-        return jsonify({"message": "Status successfully updated"}), 200
-    else:
+    if data["status"] not in LOT_STATUSES:
         return jsonify({"error": "Wrong parking lot status"}), 400
 
+    # Single UPDATE by (parking_id, lot_index), no lot list is loaded
+    updated = set_lot_status(db, parking_id, lot_index, data["status"])
+    if updated is None:
+        db.rollback()
+        return jsonify({"error": "Parking lot not found"}), 404
+    db.commit()
+    return jsonify({"message": "Status successfully updated"}), 200
 
-@parking_bp.route("<string:parking_id>/entering", methods=["POST"])
+
+@parking_bp.route("<int:parking_id>/entering", methods=["POST"])
 def car_entering(parking_id):
     db: DbSessionType = cast(DbSessionType, g.db)
 
@@ -182,18 +459,65 @@ def car_entering(parking_id):
     auto = data.get("auto", True)
 
     if auto:
-        booking = (
-            db.query(Booking)
-            .join(Booking.car)
-            .filter(Booking.parking_id == parking_id)
-            .filter(Car.license_plate == license_plate)
-            .first()
-        )
+        # Open bookings of this plate valid right now, from the in-memory gate index
+        booking_id = gate_index.lookup(db, parking_id, license_plate)
 
-        if not booking:
+        if booking_id is None:
             return (
                 jsonify({"error": "No active booking found for this license plate"}),
                 404,
             )
 
+        # The car parks wherever it likes; its reserved lot goes back to the pool
+        try:
+            booking = db.query(Booking).filter(Booking.id == booking_id, Booking.lot_id.isnot(None)).first()
+            if booking is not None:
+                release_booking_lot(db, booking)
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            return jsonify({"error": str(e)}), 500
+
         return jsonify({"message": "This car is booked", "status": "open"}), 200
+
+
+## Batched gate and sensor events from a parking's controller
+@parking_bp.route("/<int:parking_id>/events", methods=["POST"])
+def ingest_parking_events(parking_id):
+    """Apply many entry, exit and lot_status events in one transaction.
+
+    Body: a JSON array of events, or {"events": [...]}. Every event has an
+    `id` unique per parking, a `type` and an optional ISO `ts`:
+        {"id": "c1-1041", "type": "entry", "license_plate": "AA1234BC"}
+        {"id": "c1-1042", "type": "lot_status", "lot_index": 3, "status": "taken"}
+    Results come back in order; resent ids are not applied twice.
+    """
+    db: DbSessionType = cast(DbSessionType, g.db)
+
+    data = request.get_json(silent=True)
+    events = data.get("events") if isinstance(data, dict) else data
+    if not isinstance(events, list):
+        return jsonify({"error": "Expected a JSON array of events"}), 400
+    if len(events) > events_config.EVENT_BATCH_MAX:
+        return jsonify({"error": f"At most {events_config.EVENT_BATCH_MAX} events per request"}), 413
+
+    try:
+        if db.query(Parking.id).filter_by(id=parking_id).scalar() is None:
+            return jsonify({"error": "Parking not found"}), 404
+
+        results, completed = ingest_events(db, parking_id, events)
+        db.commit()
+        for booking in completed:
+            availability_index.booking_changed(booking)
+    except IntegrityError:
+        db.rollback()
+        # The same events are being applied by another request; a resend gets their results
+        return jsonify({"error": "Events are already being applied, resend the batch"}), 409
+    except Exception as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    summary = {"applied": 0, "duplicate": 0, "rejected": 0}
+    for result in results:
+        summary["duplicate" if result.get("duplicate") else result["status"]] += 1
+    return jsonify({"results": results, **summary}), 200
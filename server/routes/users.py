@@ -7,6 +7,18 @@ from config.azure_config import azure_config
 from config.logs_config import logger
 from utils.graphAPI import create_b2c_user
 from utils.roles import get_roles, register_roles, can_assign_roles
+from auth.roles import get_user_roles, invalidate_user_roles
+from utils.pagination import keyset_page, cursor_meta, offset_page, InvalidCursor
+from utils.counts import get_total
+from db.loaders import USER_WITH_ROLES
+from db.projections import (
+    USER,
+    CAR,
+    BOOKING_EXTENDED,
+    roles_by_user,
+    requested_fields,
+    InvalidFields,
+)
 from utils.blob_service import delete_blob, generate_sas_url
 
 from typing import cast
@@ -88,6 +100,7 @@ def delete_user(user_id):
 
         db.delete(user)
         db.commit()
+        invalidate_user_roles(user_id)
 
         return jsonify({"status": "success", "message": f"User {user_id} deleted"}), 204
 
@@ -118,45 +131,48 @@ def get_users():
                 .join(Role, Role.id == UserRole.role_id)\
                 .filter(Role.name == role)
 
-        # Count after filters
-        total = query.count()
+        # "roles" isn't a column, it is looked up for the page below
+        fields = requested_fields(USER, extra=("roles",))
+        with_roles = fields is None or "roles" in fields
+        projected, serialize = USER.select(
+            query,
+            [name for name in fields if name != "roles"] if fields is not None else None,
+            keys=(User.id, User.email),
+        )
 
-        # Pagination math
-        offset = (page - 1) * per_page
+        # Count after filters
+        total = get_total(db, query, ("user", "user_role", "role"))
 
-        # Apply pagination
-        users = (
-            query.order_by(User.id)
-                .offset(offset)
-                .limit(per_page)
-                .all()
-        )
+        # Opt-in keyset pagination: ?cursor= (empty for the first page)
+        cursor = request.args.get("cursor")
+        if cursor is not None:
+            users, next_cursor = keyset_page(projected, per_page, cursor, User.id)
+        else:
+            # Apply pagination
+            users, meta = offset_page(projected.order_by(User.id), page, per_page, total)
 
         user_list = []
+        stored_roles = roles_by_user(db, [user.id for user in users]) if with_roles else {}
 
         for user in users:
-            roles = (
-                [role.name for role in user.roles]
-                if hasattr(user, "roles")
-                else get_roles(user.email)
-            )
-            user_data = user.to_dict()
-            user_data["roles"] = roles
+            user_data = serialize(user)
+            if with_roles:
+                # Stored roles, falling back to the defaults for unregistered ones
+                user_data["roles"] = stored_roles.get(user.id) or get_roles(user.email)
             user_list.append(user_data)
 
+        if cursor is not None:
+            return jsonify({"users": user_list, "total": total, **cursor_meta(per_page, next_cursor)}), 200
+
         result = {
             "users": user_list,
-            "total": total,
-            "page": page,
-            "pages": (total + per_page - 1) // per_page,
-            "has_next": offset + per_page < total,
-            "has_prev": page > 1,
-            "next_page": page + 1 if offset + per_page < total else None,
-            "prev_page": page - 1 if page > 1 else None,
+            **meta,
         }
 
         return jsonify(result), 200
 
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -166,15 +182,11 @@ def get_users():
 def get_user(user_id):
     db: DbSessionType = cast(DbSessionType, g.db)
     try:
-        user = db.query(User).filter_by(id=user_id).first()
+        user = db.query(User).options(*USER_WITH_ROLES).filter_by(id=user_id).first()
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        roles = (
-            [role.name for role in user.roles]
-            if hasattr(user, "roles")
-            else get_roles(user.email)
-        )
+        roles = user.get_roles() or get_roles(user.email)
 
         user_data = user.to_dict()
         user_data["roles"] = roles
@@ -240,7 +252,7 @@ def set_user_roles(user_id):
         if not current_user:
             return jsonify({"error": "Current user not found"}), 401
         
-        current_user_roles = current_user.get_roles()
+        current_user_roles = get_user_roles(db, current_user_id)
         
         # Get target user
         target_user = db.query(User).filter_by(id=user_id).first()
@@ -272,6 +284,7 @@ def set_user_roles(user_id):
             db.add(user_role)
         
         db.commit()
+        invalidate_user_roles(user_id)
         
         # Return updated roles
         updated_roles = target_user.get_roles()
@@ -319,31 +332,33 @@ def get_user_cars(user_id):
         page = request.args.get("page", default=1, type=int)
         per_page = request.args.get("per_page", default=10, type=int)
         query = db.query(Car).filter_by(owner_id=user_id)
+        fields = requested_fields(CAR)
         # Count after filters
-        total = query.count()
-
-        # Pagination math
-        offset = (page - 1) * per_page
+        total = get_total(db, query, ("car",))
+
+        # Opt-in keyset pagination: ?cursor= (empty for the first page)
+        cursor = request.args.get("cursor")
+        if cursor is not None:
+            projected, serialize = CAR.select(query, fields, keys=(Car.id,))
+            cars, next_cursor = keyset_page(projected, per_page, cursor, Car.id)
+            result = {
+                "cars": [serialize(car) for car in cars],
+                "total": total,
+                **cursor_meta(per_page, next_cursor),
+            }
+            return jsonify(result), 200
 
         # Apply pagination
-        cars = (
-            query.order_by(Car.id)
-                .offset(offset)
-                .limit(per_page)
-                .all()
-        )
+        projected, serialize = CAR.select(query.order_by(Car.id), fields)
+        cars, meta = offset_page(projected, page, per_page, total)
         result = {
-            "cars": [car.to_dict() for car in cars],
-            "total": total,
-            "page": page,
-            "pages": (total + per_page - 1) // per_page,
-            "has_next": offset + per_page < total,
-            "has_prev": page > 1,
-            "next_page": page + 1 if offset + per_page < total else None,
-            "prev_page": page - 1 if page > 1 else None,
+            "cars": [serialize(car) for car in cars],
+            **meta,
         }
         return jsonify(result), 200
 
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -450,32 +465,37 @@ def get_user_bookings(user_id):
 
         query = query.order_by(Booking.id.asc())
 
-        total = query.count()
+        fields = requested_fields(BOOKING_EXTENDED)
+        total = get_total(db, query, ("booking", "parking"))
 
-        offset = (page - 1) * per_page
-        bookings = (
-            query.offset(offset)
-                 .limit(per_page)
-                 .all()
-        )
+        # Opt-in keyset pagination: ?cursor= (empty for the first page)
+        cursor = request.args.get("cursor")
+        if cursor is not None:
+            projected, serialize = BOOKING_EXTENDED.select(query, fields, keys=(Booking.id,))
+            bookings, next_cursor = keyset_page(projected, per_page, cursor, Booking.id)
+            result = {
+                "bookings": [serialize(b) for b in bookings],
+                "total": total,
+                **cursor_meta(per_page, next_cursor),
+            }
+            return jsonify(result), 200
+
+        projected, serialize = BOOKING_EXTENDED.select(query, fields)
+        bookings, meta = offset_page(projected, page, per_page, total)
 
         # 8. Serialize
-        bookings_list = [b.to_dict_extended() for b in bookings]
+        bookings_list = [serialize(b) for b in bookings]
 
         # 9. Pagination meta
         result = {
             "bookings": bookings_list,
-            "total": total,
-            "page": page,
-            "pages": (total + per_page - 1) // per_page,
-            "has_next": offset + per_page < total,
-            "has_prev": page > 1,
-            "next_page": page + 1 if offset + per_page < total else None,
-            "prev_page": page - 1 if page > 1 else None,
+            **meta,
         }
 
         return jsonify(result), 200
 
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
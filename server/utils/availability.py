@@ -0,0 +1,172 @@
+import time
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from db.models import Booking, Parking
+from config.config import availability_config
+from utils.parking_lots import CLOSED_STATUSES
+from utils.pubsub import PubSub, pubsub
+
+BOOKINGS_CHANNEL = "bookings.changed"
+
+
+class _ParkingIntervals:
+    """Sorted start and end times of the bookings of one parking."""
+
+    __slots__ = ("starts", "ends", "bookings", "loaded_at")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.bookings: Dict[int, Tuple[datetime, datetime]] = {}
+        self.loaded_at = time.time()
+
+    def add(self, booking_id: int, start: datetime, end: datetime):
+        self.remove(booking_id)
+        self.bookings[booking_id] = (start, end)
+        insort(self.starts, start)
+        insort(self.ends, end)
+
+    def remove(self, booking_id: int):
+        interval = self.bookings.pop(booking_id, None)
+        if interval is None:
+            return
+        start, end = interval
+        del self.starts[bisect_left(self.starts, start)]
+        del self.ends[bisect_left(self.ends, end)]
+
+    def peak(self, t_from: datetime, t_to: datetime) -> Tuple[int, int]:
+        """Return (overlapping bookings, max bookings at once) in [t_from, t_to).
+
+        Bookings are half-open intervals [start, end). Only the start/end
+        points inside the window are swept, found by bisection.
+        """
+        overlapping = bisect_left(self.starts, t_to) - bisect_right(self.ends, t_from)
+        current = bisect_right(self.starts, t_from) - bisect_right(self.ends, t_from)
+
+        starts = self.starts[bisect_right(self.starts, t_from):bisect_left(self.starts, t_to)]
+        ends = self.ends[bisect_right(self.ends, t_from):bisect_left(self.ends, t_to)]
+        peak = current
+        i = j = 0
+        while i < len(starts):
+            # An end at the same instant frees the spot before the next start
+            if j < len(ends) and ends[j] <= starts[i]:
+                current -= 1
+                j += 1
+            else:
+                current += 1
+                i += 1
+                peak = max(peak, current)
+        return overlapping, peak
+
+
+class AvailabilityIndex:
+    """In-memory interval index over bookings, per parking.
+
+    A parking is loaded from the DB on its first query and then kept up
+    to date incrementally from `BOOKINGS_CHANNEL` events, published on
+    booking create, patch and cancel, so other workers on the same pub/sub
+    backend stay in sync. Each parking is reloaded after `ttl` seconds as
+    a safety net.
+    """
+
+    def __init__(self, pubsub: PubSub, ttl: int = 300):
+        self.ttl = ttl
+        self._parkings: Dict[int, _ParkingIntervals] = {}
+        self._pending: List[list] = []  # one buffer per load in progress
+        self._lock = threading.Lock()
+        self._pubsub = pubsub
+        self._pubsub.subscribe(BOOKINGS_CHANNEL, self._on_booking_changed)
+
+    def booking_changed(self, booking: Booking, deleted: bool = False) -> None:
+        """Publish a committed booking change to every worker's index."""
+        self._pubsub.publish(
+            BOOKINGS_CHANNEL,
+            {
+                "id": booking.id,
+                "parking_id": booking.parking_id,
+                "start": booking.start.isoformat(),
+                "end": booking.end.isoformat(),
+                "active": not deleted and booking.status not in CLOSED_STATUSES,
+                # For the gate index (utils.gate_index)
+                "status": None if deleted else booking.status,
+                "plate": None if deleted or booking.car is None else booking.car.license_plate,
+            },
+        )
+
+    def _apply(self, parking_id: int, intervals: _ParkingIntervals, message: dict) -> None:
+        # Drop the booking wherever it was, it may have moved parking
+        intervals.remove(message["id"])
+        if int(message["parking_id"]) == parking_id and message["active"]:
+            intervals.add(
+                message["id"],
+                datetime.fromisoformat(message["start"]),
+                datetime.fromisoformat(message["end"]),
+            )
+
+    def _on_booking_changed(self, message: dict) -> None:
+        with self._lock:
+            for parking_id, intervals in self._parkings.items():
+                self._apply(parking_id, intervals, message)
+            for pending in self._pending:
+                pending.append(message)
+
+    def _load(self, db: Session, parking_id: int) -> _ParkingIntervals:
+        intervals = _ParkingIntervals()
+        rows = (
+            db.query(Booking.id, Booking.start, Booking.end)
+            .filter(Booking.parking_id == parking_id)
+            .filter(Booking.status.notin_(CLOSED_STATUSES))
+            .order_by(Booking.start)
+        )
+        for booking_id, start, end in rows:
+            intervals.bookings[booking_id] = (start, end)
+            intervals.starts.append(start)
+            intervals.ends.append(end)
+        intervals.ends.sort()
+        return intervals
+
+    def _get(self, db: Session, parking_id: int) -> _ParkingIntervals:
+        intervals = self._parkings.get(parking_id)
+        if intervals is None or time.time() - intervals.loaded_at > self.ttl:
+            pending = []
+            with self._lock:
+                self._pending.append(pending)
+            try:
+                intervals = self._load(db, parking_id)
+            except Exception:
+                with self._lock:
+                    self._pending.remove(pending)
+                raise
+            with self._lock:
+                self._pending.remove(pending)
+                # Replay what changed while the bookings were being read
+                for message in pending:
+                    self._apply(parking_id, intervals, message)
+                self._parkings[parking_id] = intervals
+        return intervals
+
+    def query(self, db: Session, parking_id: int, t_from: datetime, t_to: datetime) -> Optional[dict]:
+        """How many spots of a parking are free during the whole window."""
+        total_spots = db.query(Parking.total_spots).filter(Parking.id == parking_id).scalar()
+        if total_spots is None:
+            return None
+        intervals = self._get(db, parking_id)
+        with self._lock:
+            overlapping, peak = intervals.peak(t_from, t_to)
+        return {
+            "parkingId": parking_id,
+            "from": t_from.strftime("%Y-%m-%dT%H:%M"),
+            "to": t_to.strftime("%Y-%m-%dT%H:%M"),
+            "totalSpots": total_spots,
+            "overlappingBookings": overlapping,
+            "peakBookings": peak,
+            "availableSpots": max(total_spots - peak, 0),
+        }
+
+
+availability_index = AvailabilityIndex(pubsub, ttl=availability_config.AVAILABILITY_INDEX_TTL)
@@ -0,0 +1,110 @@
+import zlib
+from typing import Iterable, Iterator
+
+from flask import Response, request
+
+from config.config import compression_config
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-pem-file",
+    "text/csv",
+    "text/event-stream",
+    "text/html",
+    "text/plain",
+}
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        # wbits=31: gzip container
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def flush(self) -> bytes:
+        # Sync flush, so a streamed chunk reaches the client without waiting for the next
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+def _compressor(encoding: str):
+    if encoding == "br":
+        return _Brotli(compression_config.COMPRESS_BR_QUALITY)
+    return _Gzip(compression_config.COMPRESS_LEVEL)
+
+
+def _negotiate() -> str:
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered) or ""
+
+
+def _stream(chunks: Iterable[bytes], compressor) -> Iterator[bytes]:
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(response: Response) -> Response:
+    """after_request hook: gzip/brotli-encode text and JSON responses.
+
+    Buffered bodies under COMPRESS_MIN_SIZE are sent as is; streamed
+    bodies are compressed chunk by chunk and flushed after each one.
+    Strong ETags become weak ones, as the bytes now depend on the
+    encoding; conditional requests compare them weakly.
+    """
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _negotiate()
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = _stream(response.response, _compressor(encoding))
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < compression_config.COMPRESS_MIN_SIZE:
+            return response
+        compressor = _compressor(encoding)
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
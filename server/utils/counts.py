@@ -0,0 +1,149 @@
+import time
+import threading
+from typing import Iterable, Optional
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config.config import count_config
+from config.logs_config import logger
+from utils.pubsub import PubSub, pubsub
+
+INVALIDATION_CHANNEL = "counts.invalidate"
+
+# Request args that page or shape a list without changing what is counted
+NON_FILTER_ARGS = {"page", "per_page", "sort", "cursor", "with_total", "fields"}
+
+
+class CountCache:
+    """Short-lived cache of list totals, keyed by endpoint and filters.
+
+    Every entry remembers the tables its query reads. Committed writes to
+    any of those tables drop the entry on every worker (see the session
+    hooks below), so the TTL only bounds staleness from writes made
+    outside this app.
+    """
+
+    def __init__(self, pubsub: PubSub, ttl: int = 30, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._pubsub = pubsub
+        self._pubsub.subscribe(INVALIDATION_CHANNEL, self._on_invalidate)
+
+    def get(self, key) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self._entries.pop(key, None)
+                return None
+            return entry[1]
+
+    def set(self, key, value: int, tables: Iterable[str]) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            self._entries[key] = (time.time() + self.ttl, value, frozenset(tables))
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        self._pubsub.publish(INVALIDATION_CHANNEL, {"tables": sorted(tables)})
+
+    def _on_invalidate(self, message: dict) -> None:
+        tables = set(message.get("tables") or [])
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[2] & tables]:
+                del self._entries[key]
+
+
+count_cache = CountCache(pubsub, ttl=count_config.COUNT_CACHE_TTL)
+
+
+# --- Write-based invalidation ---
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    tables = session.info.setdefault("written_tables", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            tables.add(table)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            orm_execute_state.session.info.setdefault("written_tables", set()).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session):
+    tables = session.info.pop("written_tables", None)
+    if tables:
+        count_cache.invalidate(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tables(session):
+    session.info.pop("written_tables", None)
+
+
+# --- Totals for list endpoints ---
+def total_mode() -> str:
+    """`?with_total=` value: "true" (default), "false" or "estimate"."""
+    mode = (request.args.get("with_total") or "true").lower()
+    return mode if mode in ("true", "false", "estimate") else "true"
+
+
+def _estimate(db: Session, query) -> Optional[int]:
+    """Planner row estimate (PostgreSQL only); None when unavailable."""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    try:
+        # Filter values stay bound parameters (in the driver's paramstyle),
+        # and a failed EXPLAIN only rolls back its savepoint, not the request's session
+        compiled = query.statement.compile(
+            dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True}
+        )
+        with db.begin_nested():
+            plan = db.connection().exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+            ).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.debug(f"Count estimate failed, falling back to exact count: {e}")
+        return None
+
+
+def get_total(db: Session, query, tables: Iterable[str], count: Optional[int] = None) -> Optional[int]:
+    """Total for the current list request, honouring `?with_total=`.
+
+    Returns None when the client opted out. Exact totals are memoized per
+    endpoint and normalized filter set; `estimate` uses the query planner's
+    estimate where the database offers one. A `count` the caller already
+    ran over `query` is returned as is and refreshes the memo.
+    """
+    mode = total_mode()
+    if mode == "false":
+        return None
+    if mode == "estimate" and count is None:
+        estimate = _estimate(db, query)
+        if estimate is not None:
+            return estimate
+
+    filters = tuple(
+        sorted((k, v) for k, v in request.args.items() if k not in NON_FILTER_ARGS and v != "")
+    )
+    key = (request.endpoint, tuple(sorted((request.view_args or {}).items())), filters)
+    if count is not None:
+        count_cache.set(key, count, tables)
+        return count
+    total = count_cache.get(key)
+    if total is None:
+        total = query.count()
+        count_cache.set(key, total, tables)
+    return total
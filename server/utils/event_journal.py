@@ -0,0 +1,160 @@
+import os
+import json
+import heapq
+import atexit
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from config.config import journal_config
+from config.logs_config import logger
+
+
+class EventJournal:
+    """Append-only, buffered journal of JSON events.
+
+    `append` only adds a line to an in-memory buffer. A background thread
+    writes the buffer to the current segment and fsyncs it every
+    `fsync_interval` seconds (or as soon as the buffer exceeds
+    `buffer_max_bytes`). Segments are rotated once they reach
+    `segment_max_bytes`.
+
+    Each process writes its own segments (`<name>-<pid>-<seq>.jsonl`), so
+    several workers can share one directory; `read` merges them by time.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        name: str,
+        fsync_interval: float = 1.0,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        buffer_max_bytes: int = 256 * 1024,
+    ):
+        self.directory = Path(directory)
+        self.name = name
+        self.fsync_interval = fsync_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.buffer_max_bytes = buffer_max_bytes
+
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._file = None
+        self._seq = 0
+        self._thread = None
+        self._stopped = False
+
+    # --- Writing ---
+    def append(self, event: dict) -> None:
+        """Buffer one event; `ts` is added when missing."""
+        event.setdefault("ts", datetime.utcnow().isoformat(timespec="microseconds"))
+        line = json.dumps(event, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            self._buffer_bytes += len(line)
+            full = self._buffer_bytes >= self.buffer_max_bytes
+        self._start()
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """Write buffered events to disk and fsync them."""
+        with self._write_lock:
+            with self._lock:
+                lines, self._buffer, self._buffer_bytes = self._buffer, [], 0
+            if not lines:
+                return
+            try:
+                segment = self._current_segment()
+                segment.write("".join(lines))
+                segment.flush()
+                os.fsync(segment.fileno())
+                if segment.tell() >= self.segment_max_bytes:
+                    segment.close()
+                    self._file = None
+            except OSError as e:
+                logger.error(f"Failed to write {self.name} journal: {e}")
+
+    def close(self) -> None:
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name=f"journal-{self.name}", daemon=True
+                    )
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.fsync_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _current_segment(self):
+        if self._file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._seq = max(self._seq + 1, self._last_seq() + 1)
+            path = self.directory / f"{self.name}-{os.getpid()}-{self._seq:06d}.jsonl"
+            self._file = open(path, "a", encoding="utf-8")
+        return self._file
+
+    def _last_seq(self) -> int:
+        seqs = [int(path.stem.rsplit("-", 1)[1]) for path in self._segments(os.getpid())]
+        return max(seqs, default=0)
+
+    # --- Reading ---
+    def _segments(self, pid: Optional[int] = None):
+        pattern = f"{self.name}-{pid if pid is not None else '*'}-*.jsonl"
+        return sorted(self.directory.glob(pattern))
+
+    def _read_writer(self, paths) -> Iterator[dict]:
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+
+    def read(self, since: Optional[str] = None, **filters) -> Iterator[dict]:
+        """Yield journaled events in time order, for replay and audit.
+
+        `since` is an ISO timestamp (exclusive); other keyword arguments
+        must match event fields exactly, e.g. `read(parking_id="3")`.
+        Buffered events of this process are flushed first.
+        """
+        self.flush()
+        writers = {}
+        for path in self._segments():
+            pid = path.stem.rsplit("-", 2)[1]
+            writers.setdefault(pid, []).append(path)
+
+        streams = [self._read_writer(paths) for paths in writers.values()]
+        for event in heapq.merge(*streams, key=lambda e: e.get("ts", "")):
+            if since is not None and event.get("ts", "") <= since:
+                continue
+            if any(event.get(k) != v for k, v in filters.items()):
+                continue
+            yield event
+
+
+lot_status_journal = EventJournal(
+    journal_config.JOURNAL_DIR,
+    "lot_status",
+    fsync_interval=journal_config.JOURNAL_FSYNC_INTERVAL,
+    segment_max_bytes=journal_config.JOURNAL_SEGMENT_MAX_BYTES,
+)
@@ -0,0 +1,167 @@
+import re
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from db.models import Booking, Car, SessionLocal
+from config.config import gate_config
+from config.logs_config import logger
+from utils.availability import BOOKINGS_CHANNEL
+from utils.parking_lots import CLOSED_STATUSES
+from utils.pubsub import PubSub, pubsub
+
+_NOT_PLATE = re.compile(r"[^0-9A-Z]")
+
+
+def normalize_plate(plate: Optional[str]) -> str:
+    """Uppercase and drop separators: "aa 1234-bc" -> "AA1234BC"."""
+    return _NOT_PLATE.sub("", (plate or "").upper())
+
+
+class GateIndex:
+    """In-memory (parking_id, plate) -> bookings index for the entry gate.
+
+    Holds the open bookings that end after now and start before the next
+    reload (plus the early-arrival margin), so a gate decision is one
+    dict lookup and a check of the few intervals found. Booking create,
+    patch and delete events on `BOOKINGS_CHANNEL` update it incrementally
+    on every worker; every `refresh` seconds the window is reloaded in
+    the background, which also picks up changes made outside the API.
+    Times outside the loaded window (a controller's backlog, say) are
+    looked up in the database instead, see `find`.
+    """
+
+    def __init__(self, pubsub: PubSub, refresh: int = 300, early_arrival: int = 15):
+        self.refresh = refresh
+        self.early_arrival = timedelta(minutes=early_arrival)
+        self._entries: Dict[Tuple[int, str], Dict[int, Tuple[datetime, datetime]]] = {}
+        self._keys: Dict[int, Tuple[int, str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._covered_from: Optional[datetime] = None
+        self._covered_until: Optional[datetime] = None
+        self._pending = None  # events seen while a reload is running
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        pubsub.subscribe(BOOKINGS_CHANNEL, self._on_booking_changed)
+
+    # --- Incremental updates ---
+    def _apply(self, entries, keys, message: dict) -> None:
+        booking_id = message["id"]
+        key = keys.pop(booking_id, None)
+        if key is not None:
+            entries[key].pop(booking_id, None)
+            if not entries[key]:
+                del entries[key]
+        if not message["active"] or message.get("status") in CLOSED_STATUSES or not message.get("plate"):
+            return
+        key = (int(message["parking_id"]), normalize_plate(message["plate"]))
+        entries.setdefault(key, {})[booking_id] = (
+            datetime.fromisoformat(message["start"]),
+            datetime.fromisoformat(message["end"]),
+        )
+        keys[booking_id] = key
+
+    def _on_booking_changed(self, message: dict) -> None:
+        with self._lock:
+            self._apply(self._entries, self._keys, message)
+            if self._pending is not None:
+                self._pending.append(message)
+
+    # --- Reloads ---
+    def _load(self, db: Session) -> Tuple[dict, dict, datetime, datetime]:
+        now = datetime.now()
+        until = now + timedelta(seconds=self.refresh * 2) + self.early_arrival
+        rows = (
+            db.query(Booking.id, Booking.parking_id, Car.license_plate, Booking.start, Booking.end)
+            .join(Car, Booking.car_id == Car.id)
+            .filter(Booking.status.notin_(CLOSED_STATUSES))
+            .filter(Booking.end >= now, Booking.start <= until)
+        )
+        entries, keys = {}, {}
+        for booking_id, parking_id, plate, start, end in rows:
+            key = (parking_id, normalize_plate(plate))
+            entries.setdefault(key, {})[booking_id] = (start, end)
+            keys[booking_id] = key
+        return entries, keys, now, until
+
+    def reload(self, db: Optional[Session] = None) -> None:
+        if not self._reload_lock.acquire(blocking=False):
+            return  # another thread is already reloading
+        own_session = db is None
+        try:
+            with self._lock:
+                self._pending = []
+            db = db or SessionLocal.session_factory()
+            entries, keys, since, until = self._load(db)
+            with self._lock:
+                # Replay what changed while the window was being read
+                for message in self._pending:
+                    self._apply(entries, keys, message)
+                self._entries, self._keys = entries, keys
+                self._pending = None
+                self._loaded_at = time.time()
+                self._covered_from, self._covered_until = since, until
+        except Exception as e:
+            logger.error(f"Gate index reload failed: {e}")
+            with self._lock:
+                self._pending = None
+        finally:
+            if own_session and db is not None:
+                db.close()
+            self._reload_lock.release()
+
+    def _ensure_fresh(self, db: Session) -> None:
+        if self._covered_until is None or datetime.now() + self.early_arrival > self._covered_until:
+            # First use, or idle so long the window no longer covers now: load before answering
+            self.reload(db)
+            with self._reload_lock:
+                pass  # wait for a reload another thread had already started
+        elif time.time() - self._loaded_at > self.refresh and not self._reload_lock.locked():
+            threading.Thread(target=self.reload, name="gate-index-reload", daemon=True).start()
+
+    # --- Gate decision ---
+    def lookup(self, db: Session, parking_id: int, plate: str, at: Optional[datetime] = None) -> Optional[int]:
+        """Id of a booking letting this plate into the parking at `at` (now by default), else None."""
+        self._ensure_fresh(db)
+        at = at or datetime.now()
+        with self._lock:
+            covered = (
+                self._covered_from is not None
+                and self._covered_from <= at
+                and at + self.early_arrival <= self._covered_until
+            )
+        if not covered:
+            return self.find(db, parking_id, plate, at)
+        bookings = self._entries.get((parking_id, normalize_plate(plate)))
+        if not bookings:
+            return None
+        for booking_id, (start, end) in list(bookings.items()):
+            if start - self.early_arrival <= at <= end:
+                return booking_id
+        return None
+
+    def find(
+        self, db: Session, parking_id: int, plate: str, at: datetime, overstay: timedelta = timedelta(0)
+    ) -> Optional[int]:
+        """`lookup` from the database, for any `at`; `overstay` also matches
+        bookings that ended that long before `at`. Latest start wins."""
+        plate = normalize_plate(plate)
+        rows = (
+            db.query(Booking.id, Car.license_plate)
+            .join(Car, Booking.car_id == Car.id)
+            .filter(Booking.parking_id == parking_id, Booking.status.notin_(CLOSED_STATUSES))
+            .filter(Booking.start <= at + self.early_arrival, Booking.end >= at - overstay)
+            .order_by(Booking.start.desc())
+        )
+        for booking_id, license_plate in rows:
+            if normalize_plate(license_plate) == plate:
+                return booking_id
+        return None
+
+
+gate_index = GateIndex(
+    pubsub, refresh=gate_config.GATE_INDEX_REFRESH, early_arrival=gate_config.GATE_EARLY_ARRIVAL
+)
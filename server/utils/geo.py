@@ -0,0 +1,54 @@
+import math
+from typing import NamedTuple, Optional
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_M / 180
+
+
+class BBox(NamedTuple):
+    min_lng: float
+    min_lat: float
+    max_lng: float
+    max_lat: float
+
+    def contains(self, lat: float, lng: float) -> bool:
+        return self.min_lat <= lat <= self.max_lat and self.min_lng <= lng <= self.max_lng
+
+    @property
+    def center(self):
+        return (self.min_lat + self.max_lat) / 2, (self.min_lng + self.max_lng) / 2
+
+
+def parse_bbox(raw: Optional[str]) -> Optional[BBox]:
+    """`?bbox=minLng,minLat,maxLng,maxLat` (the GeoJSON order), None if absent."""
+    if raw is None:
+        return None
+    try:
+        bbox = BBox(*(float(part) for part in raw.split(",")))
+    except (TypeError, ValueError):
+        raise ValueError("bbox must be minLng,minLat,maxLng,maxLat")
+    if not (-180 <= bbox.min_lng <= bbox.max_lng <= 180 and -90 <= bbox.min_lat <= bbox.max_lat <= 90):
+        raise ValueError("bbox is out of range or its min is above its max")
+    return bbox
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle (haversine) distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+def bbox_around(lat: float, lng: float, radius_m: float) -> BBox:
+    """Smallest lat/lng box holding the circle; clamped at the poles and at +-180."""
+    d_lat = radius_m / METERS_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(lat))
+    d_lng = 180.0 if cos_lat < 1e-9 else min(180.0, d_lat / cos_lat)
+    return BBox(
+        max(-180.0, lng - d_lng),
+        max(-90.0, lat - d_lat),
+        min(180.0, lng + d_lng),
+        min(90.0, lat + d_lat),
+    )
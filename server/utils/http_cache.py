@@ -0,0 +1,54 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import Response, request
+
+from config.config import http_cache_config
+
+PUBLIC = f"public, max-age={http_cache_config.HTTP_CACHE_MAX_AGE}"
+PUBLIC_CRL = f"public, max-age={http_cache_config.CRL_CACHE_MAX_AGE}"
+# Authenticated resources: browsers may keep a copy but must revalidate it
+PRIVATE = "private, no-cache"
+
+
+class Validators:
+    """ETag and Last-Modified of one representation of a resource.
+
+    The strong ETag hashes the resource's version (e.g. its `updated_at`)
+    together with the request path and query string, since `?fields=`
+    and paging select a different representation. Routes check
+    `not_modified()` before serializing anything.
+    """
+
+    __slots__ = ("etag", "last_modified", "cache_control")
+
+    def __init__(self, version, last_modified: Optional[datetime], cache_control: str = PUBLIC):
+        digest = hashlib.sha1(f"{version!r}|{request.full_path}".encode("utf-8"))
+        self.etag = digest.hexdigest()
+        # Stored datetimes are naive UTC; HTTP dates have whole seconds
+        self.last_modified = (
+            last_modified.replace(microsecond=0, tzinfo=last_modified.tzinfo or timezone.utc)
+            if last_modified
+            else None
+        )
+        self.cache_control = cache_control
+
+    def not_modified(self) -> Optional[Response]:
+        """A 304 response if the client's copy is current, else None."""
+        if request.if_none_match:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+            fresh = request.if_none_match.contains_weak(self.etag)
+        else:
+            since = request.if_modified_since
+            fresh = bool(since and self.last_modified and self.last_modified <= since)
+        if not fresh:
+            return None
+        return self.apply(Response(status=304))
+
+    def apply(self, response: Response) -> Response:
+        response.set_etag(self.etag)
+        if self.last_modified:
+            response.last_modified = self.last_modified
+        response.headers["Cache-Control"] = self.cache_control
+        return response
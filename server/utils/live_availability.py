@@ -0,0 +1,198 @@
+import time
+import queue
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from db.models import Parking, SessionLocal
+from config.config import stream_config
+from config.logs_config import logger
+from utils.geo import BBox
+from utils.pubsub import PubSub, pubsub
+
+AVAILABILITY_CHANNEL = "parkings.availability"
+
+# Queued instead of a delta when a client fell behind: it gets a new snapshot
+RESYNC = object()
+
+
+def mark_availability_changed(session: Session, parking_id) -> None:
+    """Note that this transaction changed a parking's spot counters.
+
+    Called by the counter updates in utils.parking_lots; the ids are
+    published on `AVAILABILITY_CHANNEL` once the transaction commits.
+    """
+    session.info.setdefault("availability_changed", set()).add(int(parking_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_availability_changes(session):
+    ids = session.info.pop("availability_changed", None)
+    if ids:
+        pubsub.publish(AVAILABILITY_CHANNEL, {"ids": sorted(ids)})
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_availability_changes(session):
+    session.info.pop("availability_changed", None)
+
+
+def _row_to_dict(row) -> dict:
+    return {"id": row.id, "availableSpots": row.available_spots, "totalSpots": row.total_spots}
+
+
+class Subscription:
+    """One stream client: the parkings it watches and its outgoing queue."""
+
+    __slots__ = ("ids", "bbox", "queue")
+
+    def __init__(self, ids: Optional[Set[int]], bbox: Optional[BBox], queue_size: int):
+        self.ids = ids
+        self.bbox = bbox
+        self.queue = queue.Queue(maxsize=queue_size)
+
+    def matches(self, parking_id: int, lat: float, lng: float) -> bool:
+        if self.ids is not None and parking_id not in self.ids:
+            return False
+        return self.bbox is None or self.bbox.contains(lat, lng)
+
+    def push(self, item) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Slow client: drop its backlog, it will get a fresh snapshot instead
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(RESYNC)
+
+
+class TooManyStreams(Exception):
+    """The worker already serves `max_clients` streams."""
+
+
+class AvailabilityBroadcaster:
+    """Fans parking availability changes out to the connected stream clients.
+
+    Committed counter changes arrive as parking ids on `AVAILABILITY_CHANNEL`
+    from every worker. They are collected for `interval` seconds, then the
+    current counters of those parkings are read in one query and each
+    client gets the ones it watches that differ from what was last sent.
+    Nothing is read while no client is connected.
+
+    Each client holds a worker thread for as long as it is connected, so
+    a worker accepts at most `max_clients` streams.
+    """
+
+    def __init__(self, pubsub: PubSub, interval: float = 0.05, queue_size: int = 100, max_clients: int = 100):
+        self.interval = interval
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._subscriptions: Set[Subscription] = set()
+        self._pending: Set[int] = set()
+        self._sent: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        pubsub.subscribe(AVAILABILITY_CHANNEL, self._on_changed)
+
+    # --- Clients ---
+    def subscribe(self, ids: Optional[Iterable[int]] = None, bbox: Optional[BBox] = None) -> Subscription:
+        subscription = Subscription(set(ids) if ids is not None else None, bbox, self.queue_size)
+        with self._lock:
+            if len(self._subscriptions) >= self.max_clients:
+                raise TooManyStreams(f"At most {self.max_clients} streams per worker")
+            self._subscriptions.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="availability-broadcaster", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            if not self._subscriptions:
+                # Changes aren't tracked without clients, what was sent goes stale
+                self._sent.clear()
+
+    def snapshot(self, subscription: Subscription) -> List[dict]:
+        """Current counters of every parking the client watches."""
+        db = SessionLocal.session_factory()
+        try:
+            query = db.query(Parking.id, Parking.available_spots, Parking.total_spots)
+            if subscription.ids is not None:
+                query = query.filter(Parking.id.in_(subscription.ids))
+            bbox = subscription.bbox
+            if bbox is not None:
+                query = query.filter(
+                    Parking.latitude.between(bbox.min_lat, bbox.max_lat),
+                    Parking.longitude.between(bbox.min_lng, bbox.max_lng),
+                )
+            return [_row_to_dict(row) for row in query.order_by(Parking.id)]
+        finally:
+            db.close()
+
+    # --- Changes ---
+    def _on_changed(self, message: dict) -> None:
+        with self._lock:
+            if not self._subscriptions:
+                return
+            self._pending.update(message.get("ids") or [])
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            # Let a burst of commits (e.g. an event batch) coalesce into one read
+            self._wakeup.clear()
+            time.sleep(self.interval)
+            with self._lock:
+                ids, self._pending = self._pending, set()
+            if ids:
+                try:
+                    self._broadcast(ids)
+                except Exception as e:
+                    logger.error(f"Availability broadcast failed: {e}")
+
+    def _broadcast(self, ids: Set[int]) -> None:
+        db = SessionLocal.session_factory()
+        try:
+            rows = (
+                db.query(Parking.id, Parking.available_spots, Parking.total_spots, Parking.latitude, Parking.longitude)
+                .filter(Parking.id.in_(ids))
+                .all()
+            )
+        finally:
+            db.close()
+
+        changed = []
+        with self._lock:
+            # Against what the current clients were sent; unsubscribe may have just cleared it
+            subscriptions = list(self._subscriptions)
+            if not subscriptions:
+                return
+            for row in rows:
+                counters = (row.available_spots, row.total_spots)
+                if self._sent.get(row.id) != counters:
+                    self._sent[row.id] = counters
+                    changed.append(row)
+        for subscription in subscriptions:
+            deltas = [
+                _row_to_dict(row)
+                for row in changed
+                if subscription.matches(row.id, float(row.latitude), float(row.longitude))
+            ]
+            if deltas:
+                subscription.push(deltas)
+
+
+availability_broadcaster = AvailabilityBroadcaster(
+    pubsub,
+    interval=stream_config.STREAM_COALESCE_INTERVAL,
+    queue_size=stream_config.STREAM_QUEUE_SIZE,
+    max_clients=stream_config.STREAM_MAX_CLIENTS,
+)
@@ -0,0 +1,120 @@
+import json
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, DateTime
+
+
+class InvalidCursor(ValueError):
+    """Cursor is malformed or belongs to another sort order."""
+
+
+def encode_cursor(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(state, dict):
+        raise InvalidCursor("Invalid cursor")
+    return state
+
+
+def keyset_page(
+    query,
+    per_page: int,
+    cursor: Optional[str],
+    id_column,
+    sort_key: str = "id",
+    sort_column=None,
+    descending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page ordered by (sort_column, id) after an opaque cursor.
+
+    Unlike OFFSET, the database seeks straight to the row after the last
+    one returned, so page 5,000 costs the same as page 1. The cursor
+    encodes the sort key, direction and the last row's sort value and id;
+    a cursor from another sort order is rejected with InvalidCursor.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    `query` must select whole entities having `id_column`/`sort_column`,
+    and `sort_column` must be NOT NULL: NULLs never compare, so rows
+    holding them would silently drop out of the pages.
+    """
+    if sort_column is None:
+        sort_column, sort_key = id_column, "id"
+
+    if cursor:
+        state = decode_cursor(cursor)
+        if state.get("k") != sort_key or bool(state.get("d")) != descending:
+            raise InvalidCursor("Cursor does not match the requested sort order")
+        last_id = state.get("id")
+        if last_id is None:
+            raise InvalidCursor("Invalid cursor")
+        if sort_column is id_column:
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        else:
+            last_value = state.get("v")
+            if last_value is None:
+                raise InvalidCursor("Invalid cursor")
+            if isinstance(sort_column.type, DateTime):
+                try:
+                    last_value = datetime.fromisoformat(last_value)
+                except (TypeError, ValueError):
+                    raise InvalidCursor("Invalid cursor")
+            after = sort_column < last_value if descending else sort_column > last_value
+            tie = id_column < last_id if descending else id_column > last_id
+            query = query.filter(or_(after, and_(sort_column == last_value, tie)))
+
+    order = [sort_column.desc() if descending else sort_column.asc()]
+    if sort_column is not id_column:
+        order.append(id_column.desc() if descending else id_column.asc())
+    rows = query.order_by(None).order_by(*order).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        state = {"k": sort_key, "d": int(descending), "id": getattr(last, id_column.key)}
+        if sort_column is not id_column:
+            value = getattr(last, sort_column.key)
+            state["v"] = value.isoformat() if isinstance(value, datetime) else value
+        next_cursor = encode_cursor(state)
+    return rows, next_cursor
+
+
+def cursor_meta(per_page: int, next_cursor: Optional[str]) -> dict:
+    """Pagination fields of a cursor-mode list response."""
+    return {
+        "per_page": per_page,
+        "has_next": next_cursor is not None,
+        "next_cursor": next_cursor,
+    }
+
+
+def offset_page(query, page: int, per_page: int, total: Optional[int]) -> Tuple[List[Any], dict]:
+    """Fetch one OFFSET page and its pagination fields.
+
+    One extra row is fetched to tell whether a next page exists, so
+    `has_next` stays exact when `total` is an estimate or None (client
+    passed `?with_total=false`, `pages` is then None too).
+    """
+    offset = (page - 1) * per_page
+    rows = query.offset(offset).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    return rows, {
+        "total": total,
+        "page": page,
+        "pages": (total + per_page - 1) // per_page if total is not None else None,
+        "has_next": has_next,
+        "has_prev": page > 1,
+        "next_page": page + 1 if has_next else None,
+        "prev_page": page - 1 if page > 1 else None,
+    }
@@ -0,0 +1,305 @@
+import math
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import case, exists, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from db.models import Booking, Parking, ParkingLot
+from config.logs_config import logger
+from utils.live_availability import mark_availability_changed
+
+LOT_FREE = "free"
+LOT_TAKEN = "taken"
+LOT_RESERVED = "reserved"  # held by a booking until the car arrives or it is cancelled
+
+# Statuses sensors may report
+LOT_STATUSES = (LOT_TAKEN, LOT_FREE)
+
+# Bookings in these statuses hold no lot and never open the gate
+CLOSED_STATUSES = ("cancelled", "completed")
+
+
+def _number(data: dict, name: str, convert, low: float, high: float = math.inf):
+    value = data.get(name)
+    if value is None or value == "":
+        raise ValueError(f"{name} is required")
+    try:
+        value = convert(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    # NaN fails every comparison, so it is rejected here too
+    if not low <= value <= high:
+        bounds = f"in [{low}, {high}]" if high != math.inf else f"at least {low}"
+        raise ValueError(f"{name} must be {bounds}")
+    return value
+
+
+def new_parking(data: dict) -> Parking:
+    """Build a Parking from request/import data; all spots start free.
+
+    Raises ValueError for a missing location, coordinates out of range
+    or a negative capacity.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a parking object")
+    if not data.get("location"):
+        raise ValueError("location is required")
+    capacity = _number(data, "capacity", int, low=0)
+    return Parking(
+        name=data.get("name") or "Default Parking",
+        location=data["location"],
+        latitude=_number(data, "latitude", float, -90, 90),
+        longitude=_number(data, "longitude", float, -180, 180),
+        capacity=capacity,
+        available_spots=capacity,
+        total_spots=capacity,
+        created_at=datetime.utcnow(),
+    )
+
+
+def insert_lots(db: Session, parkings: List[Parking]) -> None:
+    """Insert the free lots of freshly flushed parkings in one bulk INSERT."""
+    rows = [
+        {"parking_id": parking.id, "lot_index": lot_index, "status": LOT_FREE}
+        for parking in parkings
+        for lot_index in range(parking.capacity)
+    ]
+    if rows:
+        db.execute(insert(ParkingLot), rows)
+
+
+def _update_lot(db: Session, *criteria, status: str) -> int:
+    return (
+        db.query(ParkingLot)
+        .filter(*criteria)
+        .update({"status": status, "timestamp": datetime.utcnow()}, synchronize_session=False)
+    )
+
+
+def _shift_available(db: Session, parking_id, delta: int) -> None:
+    db.query(Parking).filter(Parking.id == parking_id).update(
+        {"available_spots": Parking.available_spots + delta}, synchronize_session=False
+    )
+    mark_availability_changed(db, parking_id)
+
+
+def set_lot_status(db: Session, parking_id, lot_index: int, status: str) -> Optional[bool]:
+    """Change one lot's status and keep `Parking.available_spots` in step.
+
+    Both updates are conditional single-row statements in the caller's
+    transaction, so no lot list is loaded and concurrent sensor updates
+    can't double count. The caller commits.
+
+    A sensor reporting `free` on a lot held by an open booking (one that
+    has not ended) leaves it reserved for that booking.
+
+    Returns None if the lot does not exist, False if it already had this
+    status, True if the status changed.
+    """
+    lot = (ParkingLot.parking_id == parking_id, ParkingLot.lot_index == lot_index)
+    if status == LOT_FREE:
+        # A lot an open booking still holds goes back to reserved, never to free
+        held = exists().where(
+            Booking.lot_id == ParkingLot.id,
+            Booking.status.notin_(CLOSED_STATUSES),
+            Booking.end >= datetime.now(),
+        )
+        changed = bool(_update_lot(db, *lot, held, ParkingLot.status == LOT_TAKEN, status=LOT_RESERVED))
+        delta = 0
+        if not changed:
+            delta = 1 if _update_lot(db, *lot, ~held, ParkingLot.status != LOT_FREE, status=status) else 0
+            changed = bool(delta)
+            if delta:
+                # Bookings that still point at the lot are over; drop the stale reference
+                db.query(Booking).filter(
+                    Booking.lot_id.in_(select(ParkingLot.id).where(*lot))
+                ).update({"lot_id": None}, synchronize_session=False)
+    else:
+        # free -> taken/reserved uses up a spot; reserved -> taken leaves the counter as is
+        delta = -1 if _update_lot(db, *lot, ParkingLot.status == LOT_FREE, status=status) else 0
+        changed = bool(delta) or bool(
+            _update_lot(db, *lot, ParkingLot.status != status, status=status)
+        )
+
+    if not changed:
+        found = (
+            db.query(ParkingLot.id)
+            .filter_by(parking_id=parking_id, lot_index=lot_index)
+            .first()
+        )
+        return False if found else None
+
+    if delta:
+        _shift_available(db, parking_id, delta)
+    return True
+
+
+def reserve_lot(db: Session, parking_id, attempts: int = 5) -> Optional[int]:
+    """Atomically reserve one free lot of a parking for a booking.
+
+    Each attempt is a single conditional UPDATE that picks the first free
+    lot and flips it to reserved only if it is still free, so two
+    concurrent bookings can never get the same lot and the parking can't
+    be oversold. On PostgreSQL the candidate row is picked with
+    `FOR UPDATE SKIP LOCKED`, so concurrent bookings take different lots
+    instead of queueing on the same one.
+
+    Returns the reserved lot id, or None when the parking has no free lot.
+    The caller commits.
+    """
+    for _ in range(attempts):
+        candidate = (
+            select(ParkingLot.id)
+            .where(ParkingLot.parking_id == parking_id, ParkingLot.status == LOT_FREE)
+            .order_by(ParkingLot.lot_index)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        lot_id = db.execute(
+            update(ParkingLot)
+            .where(ParkingLot.id == candidate, ParkingLot.status == LOT_FREE)
+            .values(status=LOT_RESERVED, timestamp=datetime.utcnow())
+            .returning(ParkingLot.id)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        if lot_id is not None:
+            _shift_available(db, parking_id, -1)
+            return lot_id
+
+        # Lost a race for the candidate, or there is nothing left to take
+        if (
+            db.query(ParkingLot.id)
+            .filter(ParkingLot.parking_id == parking_id, ParkingLot.status == LOT_FREE)
+            .first()
+            is None
+        ):
+            return None
+    return None
+
+
+def release_lot(db: Session, lot_id: Optional[int]) -> bool:
+    """Free a lot reserved by a booking. The caller commits."""
+    if lot_id is None:
+        return False
+    parking_id = db.execute(
+        update(ParkingLot)
+        .where(ParkingLot.id == lot_id, ParkingLot.status == LOT_RESERVED)
+        .values(status=LOT_FREE, timestamp=datetime.utcnow())
+        .returning(ParkingLot.parking_id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if parking_id is None:
+        return False
+    _shift_available(db, parking_id, 1)
+    return True
+
+
+def release_booking_lot(db: Session, booking: Booking) -> bool:
+    """Give up the lot a booking holds: frees it if still reserved and
+    clears `booking.lot_id`, so the stale id can never release a later
+    booking's reservation of the same lot. The caller commits.
+
+    Used when the booking closes (cancel, complete, exit, delete) and
+    when its car passes the gate: from then on the car takes whatever
+    lot it parks in and the sensor counts that one.
+    """
+    if booking.lot_id is None:
+        return False
+    released = release_lot(db, booking.lot_id)
+    booking.lot_id = None
+    return released
+
+
+def release_expired_reservations(db: Session, now: Optional[datetime] = None) -> int:
+    """Release the lots still held by ended or closed bookings (no-shows,
+    bookings completed without an exit event). Commits; returns how many
+    bookings let go of a lot.
+    """
+    now = now or datetime.now()
+    expired = (
+        db.query(Booking.id, Booking.lot_id)
+        .filter(Booking.lot_id.isnot(None))
+        .filter(or_(Booking.end < now, Booking.status.in_(CLOSED_STATUSES)))
+        .all()
+    )
+    for _, lot_id in expired:
+        release_lot(db, lot_id)
+    if expired:
+        db.query(Booking).filter(Booking.id.in_([booking_id for booking_id, _ in expired])).update(
+            {"lot_id": None}, synchronize_session=False
+        )
+    db.commit()
+    return len(expired)
+
+
+def reconcile_parking_counters(db: Session, repair: bool = True) -> List[dict]:
+    """Compare parking counters with the actual lot rows and fix drift.
+
+    Runs one grouped query over `parking_lot` instead of loading lots.
+    Returns the drifted parkings; with `repair` they are corrected and
+    committed.
+    """
+    counts = (
+        db.query(
+            ParkingLot.parking_id,
+            func.count(ParkingLot.id),
+            func.sum(case((ParkingLot.status == LOT_FREE, 1), else_=0)),
+        )
+        .group_by(ParkingLot.parking_id)
+        .all()
+    )
+    actual = {parking_id: (total, free or 0) for parking_id, total, free in counts}
+
+    drifts = []
+    for parking_id, available, total in db.query(
+        Parking.id, Parking.available_spots, Parking.total_spots
+    ):
+        real_total, real_free = actual.get(parking_id, (0, 0))
+        if (available, total) != (real_free, real_total):
+            drifts.append(
+                {
+                    "parkingId": parking_id,
+                    "availableSpots": available,
+                    "totalSpots": total,
+                    "actualAvailableSpots": real_free,
+                    "actualTotalSpots": real_total,
+                }
+            )
+
+    if drifts:
+        logger.warning(f"Parking counter drift in {len(drifts)} parkings: {drifts}")
+        if repair:
+            for drift in drifts:
+                # Skip parkings whose counters moved since they were read
+                db.query(Parking).filter(
+                    Parking.id == drift["parkingId"],
+                    Parking.available_spots == drift["availableSpots"],
+                    Parking.total_spots == drift["totalSpots"],
+                ).update(
+                    {
+                        "available_spots": drift["actualAvailableSpots"],
+                        "total_spots": drift["actualTotalSpots"],
+                    },
+                    synchronize_session=False,
+                )
+                mark_availability_changed(db, drift["parkingId"])
+            db.commit()
+    return drifts
+
+
+if __name__ == "__main__":
+    # Maintenance job, e.g. from cron every few minutes: python -m utils.parking_lots [--dry-run]
+    import sys
+    from db.models import SessionLocal
+
+    session = SessionLocal()
+    try:
+        if "--dry-run" not in sys.argv:
+            released = release_expired_reservations(session)
+            print(f"{released} expired reservations released")
+        found = reconcile_parking_counters(session, repair="--dry-run" not in sys.argv)
+        print(f"{len(found)} parkings drifted")
+    finally:
+        session.close()
@@ -0,0 +1,153 @@
+import os
+import json
+import uuid
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from config.config import pubsub_config
+from config.logs_config import logger
+
+Callback = Callable[[dict], None]
+
+
+class PubSub(ABC):
+    """Minimal publish/subscribe interface used for cross-worker signals
+    (cache invalidation, live updates). Messages are JSON-serializable dicts.
+    """
+
+    @abstractmethod
+    def publish(self, channel: str, message: dict) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, channel: str, callback: Callback) -> None:
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, channel: str, callback: Callback) -> None:
+        ...
+
+
+class LocalPubSub(PubSub):
+    """In-process broker. Subscribers are called synchronously on publish."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callback]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, message: dict) -> None:
+        self._dispatch(channel, message)
+
+    def subscribe(self, channel: str, callback: Callback) -> None:
+        with self._lock:
+            self._subscribers[channel].append(callback)
+
+    def unsubscribe(self, channel: str, callback: Callback) -> None:
+        with self._lock:
+            if callback in self._subscribers.get(channel, []):
+                self._subscribers[channel].remove(callback)
+
+    def _dispatch(self, channel: str, message: dict) -> None:
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, []))
+        for callback in callbacks:
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"PubSub subscriber failed on channel {channel}: {e}")
+
+
+class FilePubSub(LocalPubSub):
+    """Local stand-in for a network broker, shared by workers on one host.
+
+    Every channel is an append-only JSON-lines file in `directory`. Messages
+    are delivered to local subscribers immediately and to other processes by
+    a daemon thread tailing the channel files every `poll_interval` seconds.
+    Files are truncated once they exceed `max_bytes`.
+    """
+
+    def __init__(self, directory: str, poll_interval: float = 0.5, max_bytes: int = 1_000_000):
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._origin = uuid.uuid4().hex
+        self._offsets: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _path(self, channel: str) -> Path:
+        return self.directory / f"{channel}.jsonl"
+
+    def publish(self, channel: str, message: dict) -> None:
+        self._dispatch(channel, message)
+        line = json.dumps({"origin": self._origin, "message": message}, default=str) + "\n"
+        path = self._path(channel)
+        try:
+            if path.exists() and path.stat().st_size > self.max_bytes:
+                path.write_text("", encoding="utf-8")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            logger.error(f"Failed to publish to channel {channel}: {e}")
+
+    def subscribe(self, channel: str, callback: Callback) -> None:
+        path = self._path(channel)
+        with self._lock:
+            if channel not in self._offsets:
+                # Only messages published after subscribing are delivered
+                self._offsets[channel] = path.stat().st_size if path.exists() else 0
+        super().subscribe(channel, callback)
+        self._start()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="pubsub-poller", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            for channel in list(self._offsets):
+                self._poll(channel)
+
+    def _poll(self, channel: str):
+        path = self._path(channel)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return
+        offset = self._offsets.get(channel, 0)
+        if size < offset:
+            offset = 0  # file was truncated
+        if size == offset:
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            f.seek(offset)
+            lines = f.readlines()
+            self._offsets[channel] = f.tell()
+        for line in lines:
+            try:
+                envelope = json.loads(line)
+            except ValueError:
+                continue
+            if envelope.get("origin") != self._origin:
+                self._dispatch(channel, envelope.get("message") or {})
+
+    def close(self):
+        self._stop.set()
+
+
+def create_pubsub() -> PubSub:
+    backend = pubsub_config.PUBSUB_BACKEND
+    if backend == "file":
+        return FilePubSub(pubsub_config.PUBSUB_DIR, pubsub_config.PUBSUB_POLL_INTERVAL)
+    if backend != "local":
+        logger.error(f"Unknown PUBSUB_BACKEND {backend!r}, falling back to local")
+    return LocalPubSub()
+
+
+pubsub = create_pubsub()
@@ -0,0 +1,34 @@
+import threading
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """Count the SQL statements the current thread runs on an engine.
+
+        with QueryCounter(engine) as counter:
+            client.get("/users/?per_page=20")
+        print(counter.count, counter.statements)
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.count = 0
+        self.statements: List[str] = []
+        self._thread = None
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            self.count += 1
+            self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        self._thread = threading.get_ident()
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        return False
@@ -2,6 +2,7 @@ from flask import g
 from config.config import manager_config
 from db.models import User, Role, UserRole
 from config.logs_config import logger
+from auth.roles import invalidate_user_roles
 
 OWNER_EMAIL = manager_config.OWNER_EMAIL
 
@@ -25,6 +26,7 @@ def register_roles(user, roles):
                 g.db.commit()
         except Exception as e:
             logger.error(f"Error while registering or creating roles: {e}")
+            invalidate_user_roles(user.id)
             return "Failed"
         try:
             # Check if the user already has this role
@@ -49,6 +51,7 @@ def register_roles(user, roles):
             g.db.rollback()
             continue
 
+    invalidate_user_roles(user.id)
     return "Success"  ## TODO Change to proper logging
 
 
@@ -0,0 +1,175 @@
+import json
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from db.models import Booking, IngestedEvent
+from config.config import events_config
+from config.logs_config import logger
+from utils.event_journal import lot_status_journal
+from utils.gate_index import gate_index
+from utils.parking_lots import LOT_STATUSES, CLOSED_STATUSES, set_lot_status, release_booking_lot
+
+EVENT_ENTRY = "entry"
+EVENT_EXIT = "exit"
+EVENT_LOT_STATUS = "lot_status"
+EVENT_TYPES = (EVENT_ENTRY, EVENT_EXIT, EVENT_LOT_STATUS)
+EVENT_ID_MAX_LENGTH = IngestedEvent.__table__.c.event_id.type.length
+
+
+class InvalidEvent(ValueError):
+    """An event that can't be applied; it is reported and not remembered."""
+
+
+def _event_time(raw) -> datetime:
+    if raw is None:
+        return datetime.now()
+    try:
+        ts = datetime.fromisoformat(str(raw))
+    except ValueError:
+        raise InvalidEvent(f"Invalid ts: {raw!r}")
+    # The gate index works in naive local time
+    return ts.astimezone().replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def _apply(db: Session, parking_id: int, event: dict, changed: List[Booking]) -> dict:
+    kind = event.get("type")
+    at = _event_time(event.get("ts"))
+
+    if kind == EVENT_LOT_STATUS:
+        status = event.get("status")
+        if status not in LOT_STATUSES or not isinstance(event.get("lot_index"), int):
+            raise InvalidEvent("Wrong parking lot status or lot_index")
+        updated = set_lot_status(db, parking_id, event["lot_index"], status)
+        if updated is None:
+            raise InvalidEvent("Parking lot not found")
+        return {"changed": updated}
+
+    if kind not in (EVENT_ENTRY, EVENT_EXIT):
+        raise InvalidEvent(f"Unknown event type: {kind!r}")
+    if not event.get("license_plate"):
+        raise InvalidEvent("license_plate is required")
+
+    if kind == EVENT_ENTRY:
+        booking_id = gate_index.lookup(db, parking_id, event["license_plate"], at=at)
+    else:
+        # The index only covers bookings around now, and a car may leave after its booking ended
+        booking_id = gate_index.find(
+            db, parking_id, event["license_plate"], at, overstay=timedelta(minutes=events_config.EVENT_EXIT_OVERSTAY)
+        )
+    booking = db.query(Booking).filter_by(id=booking_id).first() if booking_id is not None else None
+    if kind == EVENT_ENTRY:
+        if booking is not None:
+            # The car parks wherever it likes; the sensor counts that lot
+            release_booking_lot(db, booking)
+        return {"gate": "open" if booking_id is not None else "closed", "bookingId": booking_id}
+
+    # Exit: the booking is over, its spot is no longer held for it
+    if booking is not None and booking.status not in CLOSED_STATUSES:
+        booking.status = "completed"
+        release_booking_lot(db, booking)
+        changed.append(booking)
+    return {"gate": "open", "bookingId": booking_id}
+
+
+def ingest_events(db: Session, parking_id: int, events: list) -> Tuple[List[dict], List[Booking]]:
+    """Apply a controller's batch of entry, exit and lot_status events.
+
+    Events are applied in order in the caller's transaction, each in its
+    own savepoint, so one bad event doesn't undo the others. Applied
+    events are stored by (parking_id, id) with one INSERT at the end; an
+    id seen before is not applied again and gets its stored result back
+    with `"duplicate": true`, so a controller can resend a batch whose
+    response it never got. Rejected events are not stored and may be
+    resent once fixed. Two requests applying the same new ids at once
+    make the later one fail with IntegrityError on commit or here.
+
+    Returns the per-event results and the bookings completed by exits, to
+    publish after the commit. The caller commits.
+    """
+    ids = [str(event["id"]) for event in events if isinstance(event, dict) and event.get("id") is not None]
+    seen = {
+        event_id: json.loads(result)
+        for event_id, result in db.query(IngestedEvent.event_id, IngestedEvent.result).filter(
+            IngestedEvent.parking_id == parking_id, IngestedEvent.event_id.in_(ids)
+        )
+    } if ids else {}
+
+    results, changed, applied = [], [], []
+    for event in events:
+        if not isinstance(event, dict) or event.get("id") is None:
+            results.append({"id": None, "status": "rejected", "error": "Event id is required"})
+            continue
+        event_id = str(event["id"])
+        if len(event_id) > EVENT_ID_MAX_LENGTH:
+            error = f"Event id is longer than {EVENT_ID_MAX_LENGTH} characters"
+            results.append({"id": event_id, "status": "rejected", "error": error})
+            continue
+        if event_id in seen:
+            results.append({**seen[event_id], "duplicate": True})
+            continue
+
+        if event.get("type") == EVENT_LOT_STATUS:
+            # Buffered; written and fsynced in batches by the journal thread
+            lot_status_journal.append(
+                {
+                    "parking_id": str(parking_id),
+                    "lot_index": event.get("lot_index"),
+                    "event_id": event_id,
+                    "payload": event,
+                }
+            )
+
+        savepoint = db.begin_nested()
+        completed = []
+        try:
+            result = {"id": event_id, "status": "applied", **_apply(db, parking_id, event, completed)}
+            savepoint.commit()
+        except InvalidEvent as e:
+            savepoint.rollback()
+            results.append({"id": event_id, "status": "rejected", "error": str(e)})
+            continue
+        except Exception as e:
+            savepoint.rollback()
+            logger.error(f"Event {event_id} of parking {parking_id} failed: {e}")
+            results.append({"id": event_id, "status": "rejected", "error": str(e)})
+            continue
+
+        changed.extend(completed)
+        seen[event_id] = result
+        results.append(result)
+        applied.append(
+            {"parking_id": parking_id, "event_id": event_id, "type": event["type"], "result": json.dumps(result)}
+        )
+
+    if applied:
+        # One INSERT for the batch; a concurrent request applying the same ids
+        # fails on the primary key here and the whole batch rolls back
+        db.execute(insert(IngestedEvent), applied)
+    return results, changed
+
+
+def purge_ingested_events(db: Session, older_than_days: int) -> int:
+    """Forget event ids past the retention period. Commits."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = (
+        db.query(IngestedEvent)
+        .filter(IngestedEvent.received_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+if __name__ == "__main__":
+    # Retention job, e.g. from cron: python -m utils.sensor_events
+    from db.models import SessionLocal
+
+    session = SessionLocal()
+    try:
+        removed = purge_ingested_events(session, events_config.EVENT_ID_RETENTION_DAYS)
+        print(f"{removed} event ids purged")
+    finally:
+        session.close()
@@ -0,0 +1,160 @@
+import math
+import time
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from db.models import Parking, SessionLocal
+from config.config import geo_config
+from config.logs_config import logger
+from utils.geo import BBox, bbox_around, distance_m
+from utils.pubsub import PubSub, pubsub
+
+PARKINGS_CHANNEL = "parkings.changed"
+
+
+class ParkingSpatialIndex:
+    """In-memory grid of parking coordinates for near and bounding-box search.
+
+    Parkings are bucketed into `cell` x `cell` degree cells, so a search
+    only visits the cells its box overlaps (or scans all points when that
+    is fewer). Parking inserts, coordinate updates and deletes are
+    published on `PARKINGS_CHANNEL` after commit (see the session hooks
+    below) and applied on every worker; the whole grid is reloaded in the
+    background after `ttl` seconds as a safety net.
+    """
+
+    def __init__(self, pubsub: PubSub, cell: float = 0.01, ttl: int = 300):
+        self.cell = cell
+        self.ttl = ttl
+        self._points: Dict[int, Tuple[float, float]] = {}
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._loaded_at: Optional[float] = None
+        self._pending = None  # changes seen while a reload is running
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        pubsub.subscribe(PARKINGS_CHANNEL, self._on_parkings_changed)
+
+    def _key(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell), math.floor(lng / self.cell)
+
+    # --- Incremental updates ---
+    def _apply(self, points, cells, change: dict) -> None:
+        parking_id = change["id"]
+        old = points.pop(parking_id, None)
+        if old is not None:
+            bucket = cells.get(self._key(*old))
+            if bucket is not None:
+                bucket.discard(parking_id)
+                if not bucket:
+                    del cells[self._key(*old)]
+        if change.get("deleted"):
+            return
+        point = (float(change["lat"]), float(change["lng"]))
+        points[parking_id] = point
+        cells.setdefault(self._key(*point), set()).add(parking_id)
+
+    def _on_parkings_changed(self, message: dict) -> None:
+        with self._lock:
+            for change in message.get("parkings") or []:
+                self._apply(self._points, self._cells, change)
+                if self._pending is not None:
+                    self._pending.append(change)
+
+    # --- Reloads ---
+    def reload(self, db: Optional[Session] = None) -> None:
+        if not self._reload_lock.acquire(blocking=False):
+            return  # another thread is already reloading
+        own_session = db is None
+        try:
+            with self._lock:
+                self._pending = []
+            db = db or SessionLocal.session_factory()
+            points, cells = {}, {}
+            for parking_id, lat, lng in db.query(Parking.id, Parking.latitude, Parking.longitude):
+                self._apply(points, cells, {"id": parking_id, "lat": lat, "lng": lng})
+            with self._lock:
+                # Replay what changed while the parkings were being read
+                for change in self._pending:
+                    self._apply(points, cells, change)
+                self._points, self._cells = points, cells
+                self._pending = None
+                self._loaded_at = time.time()
+        except Exception as e:
+            logger.error(f"Parking spatial index reload failed: {e}")
+            with self._lock:
+                self._pending = None
+        finally:
+            if own_session and db is not None:
+                db.close()
+            self._reload_lock.release()
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if self._loaded_at is None:
+            self.reload(db)
+            with self._reload_lock:
+                pass  # wait for a reload another thread had already started
+        elif time.time() - self._loaded_at > self.ttl and not self._reload_lock.locked():
+            threading.Thread(target=self.reload, name="spatial-index-reload", daemon=True).start()
+
+    # --- Queries ---
+    def within(self, db: Session, bbox: BBox) -> List[Tuple[int, float, float]]:
+        """(id, lat, lng) of every parking inside the box, unordered."""
+        self._ensure_loaded(db)
+        with self._lock:
+            points, cells = self._points, self._cells
+            min_row, min_col = self._key(bbox.min_lat, bbox.min_lng)
+            max_row, max_col = self._key(bbox.max_lat, bbox.max_lng)
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > len(points):
+                candidates = points.keys()
+            else:
+                candidates = [
+                    parking_id
+                    for row in range(min_row, max_row + 1)
+                    for col in range(min_col, max_col + 1)
+                    for parking_id in cells.get((row, col), ())
+                ]
+            return [
+                (parking_id, *points[parking_id])
+                for parking_id in candidates
+                if bbox.contains(*points[parking_id])
+            ]
+
+    def near(self, db: Session, lat: float, lng: float, radius_m: float) -> List[Tuple[float, int]]:
+        """(distance in meters, id) of the parkings within the radius, nearest first."""
+        found = [
+            (distance_m(lat, lng, p_lat, p_lng), parking_id)
+            for parking_id, p_lat, p_lng in self.within(db, bbox_around(lat, lng, radius_m))
+        ]
+        return sorted(hit for hit in found if hit[0] <= radius_m)
+
+
+spatial_index = ParkingSpatialIndex(pubsub, cell=geo_config.GEO_CELL_DEGREES, ttl=geo_config.GEO_INDEX_TTL)
+
+
+# --- Write-based sync ---
+@event.listens_for(Session, "after_flush")
+def _collect_parking_changes(session, flush_context):
+    changes = None
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Parking):
+            changes = changes if changes is not None else session.info.setdefault("parkings_changed", {})
+            changes[obj.id] = {"id": obj.id, "lat": float(obj.latitude), "lng": float(obj.longitude)}
+    for obj in session.deleted:
+        if isinstance(obj, Parking):
+            changes = changes if changes is not None else session.info.setdefault("parkings_changed", {})
+            changes[obj.id] = {"id": obj.id, "deleted": True}
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_parking_changes(session):
+    changes = session.info.pop("parkings_changed", None)
+    if changes:
+        pubsub.publish(PARKINGS_CHANNEL, {"parkings": list(changes.values())})
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_parking_changes(session):
+    session.info.pop("parkings_changed", None)
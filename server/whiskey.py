@@ -1,5 +1,6 @@
 import time
-from auth.validation import check_basic_auth, validate_bearer_token
+from auth.validation import check_basic_auth
+from auth.principal import authenticate_request
 from werkzeug.wrappers import Response
 from dotenv import load_dotenv
 
@@ -50,13 +51,9 @@ class SimpleMiddleware:
 
         else:
             try:
-                auth_header = environ.get("HTTP_AUTHORIZATION", "")
-                if auth_header.startswith("Bearer "):
-                    token = auth_header.replace("Bearer ", "")
-                    token_data = validate_bearer_token(token)
-                    environ["token_data"] = token_data
-                else:
-                    raise ValueError("No Bearer token found")
+                # Validated once here and reused by the Flask hooks via environ
+                if authenticate_request(environ) is None:
+                    raise ValueError("No valid Bearer token found")
             except Exception as e:
                 logger.error(f"Error while auth: {e}")
                 response = Response(
@@ -66,8 +63,10 @@ class SimpleMiddleware:
                 )
                 return response(environ, start_response)
 
-        logger.info(
-            f"Incoming request to {environ.get('PATH_INFO')} with token_data: {environ.get('token_data')}"
+        logger.debug(
+            "Incoming request to %s with token_data: %s",
+            environ.get("PATH_INFO"),
+            environ.get("token_data"),
         )
 
         return self.app(environ, start_response)